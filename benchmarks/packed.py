@@ -0,0 +1,56 @@
+import time
+from collections.abc import Callable
+
+from character_encoding_utils import big5, gb2312, ksx1001, shiftjis
+
+_MODULES = {
+    'gb2312': (gb2312, 'abc中国汉字编码'),
+    'big5': (big5, 'abc中國漢字編碼'),
+    'shiftjis': (shiftjis, 'abc日本語の文字'),
+    'ksx1001': (ksx1001, 'abc한국어문자'),
+}
+_ITEM_COUNT = 20000
+_REPEAT = 5
+
+
+def _measure(func: Callable[[], object]) -> float:
+    best = float('inf')
+    for _ in range(_REPEAT):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    for name, (module, text) in _MODULES.items():
+        # 打包格式中 ASCII 字符也占 14 位，只有以双字节字符为主的文本才能节省空间
+        samples = {
+            'mixed': [f'{text}{i}' for i in range(_ITEM_COUNT)],
+            'cjk': [text[3:] * (1 + i % 8) for i in range(_ITEM_COUNT)],
+        }
+        for sample_name, css in samples.items():
+            char_count = sum(len(cs) for cs in css)
+            formats = {
+                'utf-8': (lambda cs: cs.encode('utf-8'), lambda bs: bs.decode('utf-8')),
+                name: (module.encode, module.decode),
+                'packed': (module.pack, module.unpack),
+            }
+            for format_name, (encode, decode) in formats.items():
+                bss = [encode(cs) for cs in css]
+                joined_bs = encode(''.join(css))
+                encode_elapsed = _measure(lambda: [encode(cs) for cs in css])
+                decode_elapsed = _measure(lambda: [decode(bs) for bs in bss])
+                joined_decode_elapsed = _measure(lambda: decode(joined_bs))
+                print(
+                    f'{name:<10} {sample_name:<6} {format_name:<10}'
+                    f' {sum(len(bs) for bs in bss) / char_count:>5.2f} bytes/char'
+                    f' {len(joined_bs) / char_count:>5.2f} bytes/char (joined)'
+                    f' {_ITEM_COUNT / encode_elapsed:>12,.0f} encode/s'
+                    f' {_ITEM_COUNT / decode_elapsed:>12,.0f} decode/s'
+                    f' {char_count / joined_decode_elapsed / 1000 / 1000:>8.2f} M chars/s (joined decode)'
+                )
+
+
+if __name__ == '__main__':
+    main()
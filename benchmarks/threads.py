@@ -0,0 +1,31 @@
+import sys
+import time
+
+from character_encoding_utils import big5, gb2312, ksx1001, shiftjis
+
+_MODULES = {
+    'gb2312': (gb2312, 'abc中国汉字编码'),
+    'big5': (big5, 'abc中國漢字編碼'),
+    'shiftjis': (shiftjis, 'abc日本語の文字'),
+    'ksx1001': (ksx1001, 'abc한국어문자'),
+}
+_ITEM_COUNT = 20000
+_WORKERS = [1, 2, 4, 8, 16]
+
+
+def main():
+    gil_enabled = sys._is_gil_enabled() if hasattr(sys, '_is_gil_enabled') else True
+    print(f'python {sys.version.split()[0]}, gil enabled: {gil_enabled}')
+    for name, (module, text) in _MODULES.items():
+        css = [f'{text}{i}' for i in range(_ITEM_COUNT)]
+        bss = module.encode_many(css, workers=1)
+        byte_count = sum(len(bs) for bs in bss)
+        for workers in _WORKERS:
+            start = time.perf_counter()
+            module.decode_many(bss, workers=workers)
+            elapsed = time.perf_counter() - start
+            print(f'{name:<10} workers={workers:<3} {_ITEM_COUNT / elapsed:>12,.0f} items/s {byte_count / elapsed / 1024 / 1024:>8.2f} MiB/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+import functools
+from collections.abc import Callable
+
+
+class CodecCache:
+    """
+    编解码结果的 LRU 缓存，只缓存较短的输入，出错的输入不缓存
+    """
+    max_length: int
+
+    def __init__(self, encode: Callable[[str], bytes], decode: Callable[[bytes], str], maxsize: int | None, max_length: int):
+        if maxsize is not None and maxsize < 0:
+            raise ValueError("'maxsize' must not be negative")
+        if max_length < 0:
+            raise ValueError("'max_length' must not be negative")
+        self.max_length = max_length
+        self._encode = encode
+        self._decode = decode
+        self._cached_encode = functools.lru_cache(maxsize)(encode)
+        self._cached_decode = functools.lru_cache(maxsize)(decode)
+
+    def encode(self, cs: str) -> bytes:
+        if len(cs) > self.max_length:
+            return self._encode(cs)
+        return self._cached_encode(cs)
+
+    def decode(self, bs: bytes | bytearray) -> str:
+        if len(bs) > self.max_length:
+            return self._decode(bs)
+        return self._cached_decode(bytes(bs))
+
+    def cache_info(self) -> dict[str, tuple[int, int, int | None, int]]:
+        """
+        编码和解码各自的 `(hits, misses, maxsize, currsize)`
+        """
+        return {
+            'encode': self._cached_encode.cache_info(),
+            'decode': self._cached_decode.cache_info(),
+        }
+
+    def cache_clear(self):
+        self._cached_encode.cache_clear()
+        self._cached_decode.cache_clear()
@@ -0,0 +1,77 @@
+import bisect
+import itertools
+from collections.abc import Callable, Iterable, Sequence
+from typing import Any, TypeVar
+
+_E = TypeVar('_E', bound=Exception)
+# 每批整体转换的行数，出错时只需要重新转换同一批中的其他行
+_BATCH_ROWS = 256
+
+
+def _convert_rows(
+        convert: Callable[[Any], Any],
+        error_type: type[_E],
+        rows: list[Any],
+        separator: Any,
+        converted_separator: Any,
+) -> tuple[list[Any], list[_E | None]]:
+    """
+    所有行用分隔符连接后一次性转换，再按分隔符拆分
+    分隔符是 ASCII 字符，不会被当作双字节字符的第二位字节，只有出错的行和本身包含分隔符的行才逐行转换
+    """
+    results = [None] * len(rows)
+    errors = [None] * len(rows)
+
+    def convert_row(index: int):
+        try:
+            results[index] = convert(rows[index])
+        except error_type as e:
+            errors[index] = e
+
+    indexes = [index for index, row in enumerate(rows) if separator not in row]
+    if len(indexes) < len(rows):
+        for index in sorted(set(range(len(rows))).difference(indexes)):
+            convert_row(index)
+    starts = list(itertools.accumulate((len(rows[index]) + 1 for index in indexes), initial=0))
+
+    segments = [(first, min(first + _BATCH_ROWS, len(indexes))) for first in range(0, len(indexes), _BATCH_ROWS)]
+    while segments:
+        first, last = segments.pop()
+        if first == last:
+            continue
+        try:
+            pieces = convert(separator.join([rows[index] for index in indexes[first:last]])).split(converted_separator)
+        except error_type as e:
+            # 出错位置所在的行单独转换，前后的行继续整体转换
+            failed = bisect.bisect_right(starts, starts[first] + e.position, first, last) - 1
+            convert_row(indexes[failed])
+            segments.append((failed + 1, last))
+            segments.append((first, failed))
+            continue
+        for index, piece in zip(indexes[first:last], pieces):
+            results[index] = piece
+    return results, errors
+
+
+def encode_rows(
+        encode: Callable[[str], bytes],
+        error_type: type[_E],
+        css: Iterable[str],
+) -> tuple[bytes, list[int], list[_E | None]]:
+    bss, errors = _convert_rows(encode, error_type, list(css), '\n', b'\n')
+    bss = [b'' if bs is None else bs for bs in bss]
+    offsets = list(itertools.accumulate(map(len, bss), initial=0))
+    return b''.join(bss), offsets, errors
+
+
+def decode_rows(
+        decode: Callable[[bytes], str],
+        error_type: type[_E],
+        bs: bytes | bytearray,
+        offsets: Sequence[int],
+) -> tuple[list[str | None], list[_E | None]]:
+    for start, end in itertools.pairwise(offsets):
+        if start > end or end > len(bs):
+            raise ValueError(f'invalid offsets ({start}, {end}) for buffer of length {len(bs)}')
+    rows = [bs[start:end] for start, end in itertools.pairwise(offsets)]
+    return _convert_rows(decode, error_type, rows, b'\n', '\n')
@@ -0,0 +1,32 @@
+import os
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from typing import TypeVar
+
+_T = TypeVar('_T')
+_R = TypeVar('_R')
+
+# 每个线程分到的任务块数，块越多负载越均衡，但调度开销也越大
+_CHUNKS_PER_WORKER = 4
+
+
+def _map_chunk(func: Callable[[_T], _R], chunk: list[_T]) -> list[_R]:
+    return [func(item) for item in chunk]
+
+
+def map_in_threads(func: Callable[[_T], _R], items: Iterable[_T], workers: int | None = None) -> list[_R]:
+    items = list(items)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError("'workers' must be at least 1")
+    if workers == 1 or len(items) <= 1:
+        return _map_chunk(func, items)
+
+    chunk_size = max(1, -(-len(items) // (workers * _CHUNKS_PER_WORKER)))
+    chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+    results = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for chunk_results in executor.map(_map_chunk, [func] * len(chunks), chunks):
+            results.extend(chunk_results)
+    return results
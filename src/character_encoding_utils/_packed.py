@@ -0,0 +1,150 @@
+import functools
+import re
+
+from character_encoding_utils import _tables
+
+# 每个字符使用 14 位的序号，每 4 个序号打包为 7 个字节
+GROUP_CODES = 4
+GROUP_SIZE = 7
+# 补齐分组的序号，解包时忽略，因此多段打包结果拼接后仍然可以直接解包
+PADDING_CODE = 0x3FFF
+_PADDING_CHAR = chr(PADDING_CODE)
+# 打包表中表示不在码位空间中的值
+_UNDEFINED_CHAR = '\uffff'
+_UNDEFINED_PATTERN = re.compile('[\uffff\U00010000-\U0010ffff]')
+
+# 2 个 16 位的序号合并为 32 位中的低 28 位，再将 2 个 28 位合并为 64 位中的低 56 位
+_MASK_CODE_LOW = b'\xff\x3f\x00\x00'
+_MASK_CODE_HIGH = b'\x00\xc0\xff\x0f'
+_MASK_CODE_HIGH_UNPACKED = b'\x00\x00\xff\x3f'
+_MASK_PAIR_LOW = b'\xff\xff\xff\x0f\x00\x00\x00\x00'
+_MASK_PAIR_HIGH = b'\x00\x00\x00\xf0\xff\xff\xff\x00'
+_MASK_PAIR_HIGH_UNPACKED = b'\x00\x00\x00\x00\xff\xff\xff\x0f'
+
+
+def build_pack_table(alphabet: str) -> str:
+    """
+    码位到序号的转换表，用于 `str.translate`
+    """
+    if len(alphabet) >= PADDING_CODE:
+        raise ValueError(f'alphabet is too large, must less than {PADDING_CODE} characters')
+    table = [_UNDEFINED_CHAR] * _tables.CATEGORY_TABLE_SIZE
+    for ordinal, c in reversed(list(enumerate(alphabet))):
+        table[ord(c)] = chr(ordinal)
+    return ''.join(table)
+
+
+@functools.lru_cache(maxsize=256)
+def _get_mask(pattern: bytes, size: int) -> int:
+    return int.from_bytes(pattern * (size // len(pattern)), 'little')
+
+
+def _pack_ordinals(ordinals: str) -> bytes:
+    ordinals += _PADDING_CHAR * (-len(ordinals) % GROUP_CODES)
+    if len(ordinals) == 0:
+        return b''
+    # 以大整数的位运算整体移位，避免逐个序号处理
+    size = len(ordinals) * 2
+    value = int.from_bytes(ordinals.encode('utf-16-le'), 'little')
+    value = value & _get_mask(_MASK_CODE_LOW, size) | value >> 2 & _get_mask(_MASK_CODE_HIGH, size)
+    value = value & _get_mask(_MASK_PAIR_LOW, size) | value >> 4 & _get_mask(_MASK_PAIR_HIGH, size)
+    bs = bytearray(value.to_bytes(size, 'little'))
+    # 每 8 个字节中最高的字节总是 0
+    del bs[GROUP_SIZE::GROUP_SIZE + 1]
+    return bytes(bs)
+
+
+def _unpack_ordinals(bs: bytes | bytearray) -> str:
+    group_count = len(bs) // GROUP_SIZE
+    size = group_count * (GROUP_SIZE + 1)
+    if size == 0:
+        return ''
+    expanded = bytearray(size)
+    for index in range(GROUP_SIZE):
+        expanded[index::GROUP_SIZE + 1] = bs[index:group_count * GROUP_SIZE:GROUP_SIZE]
+    value = int.from_bytes(expanded, 'little')
+    value = value & _get_mask(_MASK_PAIR_LOW, size) | value << 4 & _get_mask(_MASK_PAIR_HIGH_UNPACKED, size)
+    value = value & _get_mask(_MASK_CODE_LOW, size) | value << 2 & _get_mask(_MASK_CODE_HIGH_UNPACKED, size)
+    return value.to_bytes(size, 'little').decode('utf-16-le')
+
+
+def pack(cs: str, pack_table: str, encoding: str, error_type: type[Exception]) -> bytes:
+    ordinals = cs.translate(pack_table)
+    match = _UNDEFINED_PATTERN.search(ordinals)
+    if match is not None:
+        raise error_type(cs[match.start()], match.start(), f"not in the '{encoding}' packed code space")
+    return _pack_ordinals(ordinals)
+
+
+def unpack(bs: bytes | bytearray, alphabet: str, error_type: type[Exception]) -> str:
+    if len(bs) % GROUP_SIZE != 0:
+        position = len(bs) - len(bs) % GROUP_SIZE
+        raise error_type(bytes(bs[position:]), position, f'incomplete packed group, must be {GROUP_SIZE} bytes')
+    ordinals = _unpack_ordinals(bs)
+    if ordinals and max(ordinals.replace(_PADDING_CHAR, '\x00')) >= chr(len(alphabet)):
+        for index, ordinal in enumerate(map(ord, ordinals)):
+            if ordinal >= len(alphabet) and ordinal != PADDING_CODE:
+                position = index // GROUP_CODES * GROUP_SIZE
+                raise error_type(bytes(bs[position:position + GROUP_SIZE]), position, f'invalid packed code 0x{ordinal:x}')
+    # 序号超出字母表的只有补齐序号，`str.translate` 会保持原样
+    return ordinals.translate(alphabet).replace(_PADDING_CHAR, '')
+
+
+class IncrementalPacker:
+    pack_table: str
+    encoding: str
+    error_type: type[Exception]
+    pending: str
+    passed: int
+
+    def __init__(self, pack_table: str, encoding: str, error_type: type[Exception]):
+        self.pack_table = pack_table
+        self.encoding = encoding
+        self.error_type = error_type
+        self.pending = ''
+        self.passed = 0
+
+    def pack(self, cs: str, final: bool = False) -> bytes:
+        cs = self.pending + cs
+        end = len(cs) if final else len(cs) - len(cs) % GROUP_CODES
+        try:
+            bs = pack(cs[:end], self.pack_table, self.encoding, self.error_type)
+        except self.error_type as e:
+            e.position += self.passed
+            raise
+        self.pending = cs[end:]
+        self.passed += end
+        return bs
+
+    def reset(self):
+        self.pending = ''
+        self.passed = 0
+
+
+class IncrementalUnpacker:
+    alphabet: str
+    error_type: type[Exception]
+    pending: bytes
+    passed: int
+
+    def __init__(self, alphabet: str, error_type: type[Exception]):
+        self.alphabet = alphabet
+        self.error_type = error_type
+        self.pending = b''
+        self.passed = 0
+
+    def unpack(self, bs: bytes | bytearray, final: bool = False) -> str:
+        bs = self.pending + bs
+        end = len(bs) if final else len(bs) - len(bs) % GROUP_SIZE
+        try:
+            cs = unpack(bs[:end], self.alphabet, self.error_type)
+        except self.error_type as e:
+            e.position += self.passed
+            raise
+        self.pending = bs[end:]
+        self.passed += end
+        return cs
+
+    def reset(self):
+        self.pending = b''
+        self.passed = 0
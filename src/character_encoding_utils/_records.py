@@ -0,0 +1,90 @@
+from collections.abc import Callable, Sequence
+
+
+def _fit(encode: Callable[[str], bytes], error_type: type[Exception], cs: str, max_bytes: int) -> tuple[str, bytes]:
+    if max_bytes < 0:
+        raise ValueError("'max_bytes' must not be negative")
+    # 每个字符至少编码为 1 个字节
+    cs = cs[:max_bytes]
+    try:
+        bs = encode(cs)
+        if len(bs) <= max_bytes:
+            return cs, bs
+    except error_type as e:
+        # 只有无法编码的字符落在保留的部分中时才报错
+        bs = encode(cs[:e.position])
+        if len(bs) < max_bytes:
+            raise
+        if len(bs) == max_bytes:
+            return cs[:e.position], bs
+        cs = cs[:e.position]
+
+    # 二分查找编码后放得下的最长前缀，cs[:low] 放得下，cs[:high] 放不下
+    low, high = 0, len(cs)
+    low_bs = b''
+    while high - low > 1:
+        middle = (low + high) // 2
+        bs = encode(cs[:middle])
+        if len(bs) <= max_bytes:
+            low, low_bs = middle, bs
+        else:
+            high = middle
+    return cs[:low], low_bs
+
+
+def truncate_to_bytes(encode: Callable[[str], bytes], error_type: type[Exception], cs: str, max_bytes: int) -> str:
+    return _fit(encode, error_type, cs, max_bytes)[0]
+
+
+def _check_layout(widths: Sequence[int], padding: bytes):
+    if any(width < 0 for width in widths):
+        raise ValueError("'widths' must not be negative")
+    # 双字节字符的第二位字节不小于 0x40，填充字节不会与字符混淆
+    if len(padding) != 1 or padding[0] >= 0x40:
+        raise ValueError("'padding' must be a single byte below 0x40")
+
+
+def encode_record(
+        encode: Callable[[str], bytes],
+        error_type: type[Exception],
+        fields: Sequence[str],
+        widths: Sequence[int],
+        padding: bytes,
+        truncate: bool,
+) -> bytes:
+    _check_layout(widths, padding)
+    if len(fields) != len(widths):
+        raise ValueError(f'got {len(fields)} fields for {len(widths)} columns')
+    record = bytearray()
+    for index, (cs, width) in enumerate(zip(fields, widths)):
+        if truncate:
+            bs = _fit(encode, error_type, cs, width)[1]
+        else:
+            bs = encode(cs)
+            if len(bs) > width:
+                raise ValueError(f'field {index} needs {len(bs)} bytes, but column is {width} bytes wide')
+        record.extend(bs)
+        record.extend(padding * (width - len(bs)))
+    return bytes(record)
+
+
+def decode_record(
+        decode: Callable[[bytes], str],
+        error_type: type[Exception],
+        bs: bytes | bytearray,
+        widths: Sequence[int],
+        padding: bytes,
+) -> list[str]:
+    _check_layout(widths, padding)
+    if len(bs) != sum(widths):
+        raise ValueError(f'record is {len(bs)} bytes, but columns are {sum(widths)} bytes wide')
+    fields = []
+    cursor = 0
+    for width in widths:
+        try:
+            fields.append(decode(bytes(bs[cursor:cursor + width]).rstrip(padding)))
+        except error_type as e:
+            e.position += cursor
+            raise
+        cursor += width
+    return fields
@@ -0,0 +1,39 @@
+from collections.abc import Callable, Iterator
+
+
+def _iter_matches(
+        find_incomplete_start: Callable[[bytes], int],
+        is_false_match: Callable[[bytes | bytearray, int, int], bool] | None,
+        bs: bytes | bytearray,
+        needle: bytes,
+        start: int,
+        end: int,
+) -> Iterator[int]:
+    # 已知的字符边界，只会向后移动，因此整体检查的开销与字节数成正比
+    cursor = start
+    position = bs.find(needle, start, end)
+    while position != -1:
+        # 候选位置之前没有不完整的字符，说明它是字符边界
+        cursor += find_incomplete_start(bs[cursor:position])
+        if cursor == position and (is_false_match is None or not is_false_match(bs, position, position + len(needle))):
+            yield position
+            cursor = position + len(needle)
+            position = bs.find(needle, cursor, end)
+        else:
+            position = bs.find(needle, position + 1, end)
+
+
+def finditer(
+        encode: Callable[[str], bytes],
+        find_incomplete_start: Callable[[bytes], int],
+        bs: bytes | bytearray,
+        sub: str,
+        start: int,
+        end: int | None,
+        is_false_match: Callable[[bytes | bytearray, int, int], bool] | None = None,
+) -> Iterator[int]:
+    needle = encode(sub)
+    if len(needle) == 0:
+        raise ValueError("'sub' must not be empty")
+    start, end, _ = slice(start, end).indices(len(bs))
+    return _iter_matches(find_incomplete_start, is_false_match, bs, needle, start, end)
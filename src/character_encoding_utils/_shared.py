@@ -0,0 +1,82 @@
+import functools
+import os
+import pickle
+import struct
+import sys
+from collections.abc import Callable
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any
+
+# 发布共享内存表的进程设置这个环境变量，由它启动的子进程在导入时自动附加
+ENVIRON_KEY = 'CHARACTER_ENCODING_UTILS_SHARED_TABLES'
+_HEADER = struct.Struct('<Q')
+
+
+def _open_block(name: str) -> shared_memory.SharedMemory:
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name, track=False)
+    # 附加的进程不拥有共享内存，不能在退出时被资源跟踪器释放
+    block = shared_memory.SharedMemory(name)
+    resource_tracker.unregister(block._name, 'shared_memory')
+    return block
+
+
+@functools.cache
+def attach() -> tuple[shared_memory.SharedMemory, int, dict[str, tuple[int, int]]] | None:
+    name = os.environ.get(ENVIRON_KEY)
+    if not name:
+        return None
+    try:
+        block = _open_block(name)
+    except FileNotFoundError:
+        # 发布的进程已经释放了共享内存，回退到自行构建
+        return None
+    data_start = _HEADER.size + _HEADER.unpack_from(block.buf)[0]
+    directory = pickle.loads(block.buf[_HEADER.size:data_start])
+    return block, data_start, directory
+
+
+def load(module_name: str, table_name: str) -> Any | None:
+    attached = attach()
+    if attached is None:
+        return None
+    block, data_start, directory = attached
+    span = directory.get(f'{module_name}.{table_name}')
+    if span is None:
+        return None
+    start, end = span
+    return pickle.loads(block.buf[data_start + start:data_start + end])
+
+
+def cached_table(func: Callable[[], Any]) -> Callable[[], Any]:
+    """
+    与 `functools.cache` 相同，但优先从共享内存中加载
+    """
+    @functools.cache
+    @functools.wraps(func)
+    def wrapper() -> Any:
+        table = load(func.__module__, func.__name__)
+        if table is None:
+            table = func()
+        return table
+    return wrapper
+
+
+def dump(tables: dict[str, Any]) -> shared_memory.SharedMemory:
+    blobs = {key: pickle.dumps(table, pickle.HIGHEST_PROTOCOL) for key, table in tables.items()}
+    # 目录中的偏移相对于目录之后的数据区
+    directory = {}
+    cursor = 0
+    for key, blob in blobs.items():
+        directory[key] = cursor, cursor + len(blob)
+        cursor += len(blob)
+    directory_bs = pickle.dumps(directory, pickle.HIGHEST_PROTOCOL)
+
+    data_start = _HEADER.size + len(directory_bs)
+    block = shared_memory.SharedMemory(create=True, size=data_start + cursor)
+    _HEADER.pack_into(block.buf, 0, len(directory_bs))
+    block.buf[_HEADER.size:data_start] = directory_bs
+    for key, blob in blobs.items():
+        start, end = directory[key]
+        block.buf[data_start + start:data_start + end] = blob
+    return block
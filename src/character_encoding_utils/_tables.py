@@ -0,0 +1,283 @@
+import bisect
+import collections
+import heapq
+import re
+from array import array
+from collections.abc import Callable, Iterable, Iterator
+from typing import Any
+
+# 类别表中的取值，小于 CATEGORY_ID_NONE 的值是 `get_categories()` 中的序号
+CATEGORY_ID_NONE = 0xFE
+CATEGORY_ID_UNENCODABLE = 0xFF
+CATEGORY_TABLE_SIZE = 0x10000
+# 排序键表中表示需要逐个字符处理的值，所有编码都不会使用 0xFFFF 作为码位
+SORT_KEY_COMPLEX = '\uffff'
+# 无法编码的字符在分段时使用的类别名称
+UNENCODABLE_CATEGORY = 'unencodable'
+
+# 类别表之外的字符（基本多文种平面以外）经过 `str.translate` 后保持原样，都是无法编码的字符
+_CATEGORY_RUN_PATTERN = re.compile(r'([\x00-\xff])\1*|[^\x00-\xff]+')
+_UNENCODABLE_PATTERN = re.compile(r'[\xff\U00010000-\U0010ffff]')
+
+
+def build_category_table(alphabets: Iterable[Iterable[str]], uncategorized: Iterable[str]) -> str:
+    """
+    按码位索引的类别表，用于 `str.translate`，只覆盖基本多文种平面
+    可以编码但不属于任何类别的字符为 CATEGORY_ID_NONE，无法编码的字符为 CATEGORY_ID_UNENCODABLE
+    """
+    table = bytearray([CATEGORY_ID_UNENCODABLE]) * CATEGORY_TABLE_SIZE
+    for c in uncategorized:
+        table[ord(c)] = CATEGORY_ID_NONE
+    for category_id, alphabet in enumerate(alphabets):
+        for c in alphabet:
+            table[ord(c)] = category_id
+    return table.decode('latin-1')
+
+
+def _get_category_name(categories: list[str], category_id: int) -> str | None:
+    if category_id < len(categories):
+        return categories[category_id]
+    elif category_id == CATEGORY_ID_NONE:
+        return None
+    else:
+        return UNENCODABLE_CATEGORY
+
+
+def iter_category_runs(category_ids: str, categories: list[str]) -> Iterator[tuple[str | None, int, int]]:
+    run_category = None
+    run_start = 0
+    run_end = 0
+    for match in _CATEGORY_RUN_PATTERN.finditer(category_ids):
+        category_id = ord(match.group()[0])
+        category = _get_category_name(categories, category_id) if category_id <= 0xFF else UNENCODABLE_CATEGORY
+        if category != run_category and run_end > run_start:
+            yield run_category, run_start, run_end
+            run_start = match.start()
+        run_category = category
+        run_end = match.end()
+    if run_end > run_start:
+        yield run_category, run_start, run_end
+
+
+def is_encodable(category_ids: str) -> bool:
+    return _UNENCODABLE_PATTERN.search(category_ids) is None
+
+
+def find_unencodable(cs: str, category_ids: str) -> list[tuple[int, str]]:
+    return [(match.start(), cs[match.start()]) for match in _UNENCODABLE_PATTERN.finditer(category_ids)]
+
+
+def build_defined_bitmap(codec: str, extra_codes: Iterable[int] = ()) -> bytes:
+    """
+    按编码索引的位图，标记可以解码的单字节和双字节编码
+    双字节编码之间用换行分隔后一次性解码，换行不会被当作第二位字节，出错时也不会错位
+    """
+    bitmap = bytearray(CATEGORY_TABLE_SIZE // 8)
+    codes = []
+    for code in range(0x100):
+        try:
+            bytes([code]).decode(codec)
+            codes.append(code)
+        except UnicodeDecodeError:
+            pass
+    double_byte_codes = [code for code in range(0x8100, 0x10000) if code & 0xFF >= 0x40]
+    pieces = b'\n'.join(code.to_bytes(2, 'big') for code in double_byte_codes).decode(codec, 'replace').split('\n')
+    for code, piece in zip(double_byte_codes, pieces):
+        if len(piece) == 1 and piece != '\ufffd':
+            codes.append(code)
+    codes.extend(extra_codes)
+    for code in codes:
+        bitmap[code >> 3] |= 1 << (code & 7)
+    return bytes(bitmap)
+
+
+def iter_defined(bitmap: bytes, decode: Callable[[bytes], str], code_start: int, code_end: int) -> Iterator[tuple[int, str]]:
+    code_start = max(code_start, 0)
+    code_end = min(code_end, CATEGORY_TABLE_SIZE - 1)
+    # 按第一位字节分块，每块只解码一次
+    for block_start in range(code_start & ~0xFF, code_end + 1, 0x100):
+        codes = [code for code in range(max(block_start, code_start), min(block_start + 0xFF, code_end) + 1) if bitmap[code >> 3] >> (code & 7) & 1]
+        if not codes:
+            continue
+        bss = [code.to_bytes(2 if code > 0xFF else 1, 'big') for code in codes]
+        cs = decode(b''.join(bss))
+        if len(cs) != len(codes):
+            # 相邻的编码组合成了其他字符，逐个解码
+            cs = [decode(bs) for bs in bss]
+        yield from zip(codes, cs)
+
+
+def build_sort_key_table(category_table: str, encode: Callable[[str], bytes]) -> str:
+    """
+    按码位索引的排序键表，用于 `str.translate`，值为字符的编码（单字节编码高位补 0）
+    无法编码的字符和多于 2 个字节的字符为 SORT_KEY_COMPLEX
+    """
+    table = [SORT_KEY_COMPLEX] * CATEGORY_TABLE_SIZE
+    for code_point, category_id in enumerate(category_table):
+        if ord(category_id) != CATEGORY_ID_UNENCODABLE:
+            bs = encode(chr(code_point))
+            if len(bs) <= 2:
+                table[code_point] = chr(int.from_bytes(bs, 'big'))
+    return ''.join(table)
+
+
+def build_sort_key(cs: str, sort_key_table: str, encode: Callable[[str], bytes], error_type: type[Exception]) -> bytes:
+    translated = cs.translate(sort_key_table)
+    if SORT_KEY_COMPLEX not in translated:
+        key = translated.encode('utf-16-be', 'surrogatepass')
+        # 基本多文种平面以外的字符不在表中，会被原样编码成 4 个字节
+        if len(key) == len(cs) * 2:
+            return key
+
+    key = bytearray()
+    for c in cs:
+        code_point = ord(c)
+        if code_point < CATEGORY_TABLE_SIZE and sort_key_table[code_point] != SORT_KEY_COMPLEX:
+            key.extend(sort_key_table[code_point].encode('utf-16-be', 'surrogatepass'))
+            continue
+        try:
+            key.extend(encode(c))
+        except error_type:
+            # 无法编码的字符排在所有字符之后，按码位排序
+            key.extend(b'\xff\xff')
+            key.extend(code_point.to_bytes(3, 'big'))
+    return bytes(key)
+
+
+def build_sort_keys(css: Iterable[str], sort_key_table: str, encode: Callable[[str], bytes], error_type: type[Exception]) -> list[bytes]:
+    """
+    每个字符的排序键都是 2 个字节，因此可以把所有字符串拼接起来一次性转换，再按长度切分
+    """
+    css = list(css)
+    joined_cs = ''.join(css)
+    translated = joined_cs.translate(sort_key_table)
+    if SORT_KEY_COMPLEX not in translated:
+        joined_key = translated.encode('utf-16-be', 'surrogatepass')
+        if len(joined_key) == len(joined_cs) * 2:
+            keys = []
+            cursor = 0
+            for cs in css:
+                end = cursor + len(cs) * 2
+                keys.append(joined_key[cursor:end])
+                cursor = end
+            return keys
+    return [build_sort_key(cs, sort_key_table, encode, error_type) for cs in css]
+
+
+class AlphabetIndex:
+    """
+    字符与其在 `get_alphabet()` 中序号之间的双向索引
+    """
+    encoding: str
+    exception_type: type[Exception]
+    alphabet: str
+    category_spans: dict[str, tuple[int, int]]
+    ordinals: array
+    sorted_alphabets: dict[str | None, str]
+
+    def __init__(self, encoding: str, exception_type: type[Exception], category_alphabets: dict[str, Iterable[str]]):
+        self.encoding = encoding
+        self.exception_type = exception_type
+        self.category_spans = {}
+        alphabet = []
+        for category, category_alphabet in category_alphabets.items():
+            start = len(alphabet)
+            alphabet.extend(category_alphabet)
+            self.category_spans[category] = start, len(alphabet)
+        self.alphabet = ''.join(alphabet)
+        # 序号加 1 存储，0 表示不在字母表中
+        self.ordinals = array('H', bytes(2 * CATEGORY_TABLE_SIZE))
+        for ordinal, c in enumerate(self.alphabet):
+            self.ordinals[ord(c)] = ordinal + 1
+        # 按码位排序的字母表，用于二分查找 Unicode 区间
+        self.sorted_alphabets = {None: ''.join(sorted(self.alphabet))}
+        for category, (start, end) in self.category_spans.items():
+            self.sorted_alphabets[category] = ''.join(sorted(self.alphabet[start:end]))
+
+    def _get_span(self, category: str | None) -> tuple[int, int]:
+        if category is None:
+            return 0, len(self.alphabet)
+        span = self.category_spans.get(category)
+        if span is None:
+            raise self.exception_type(f"unknown '{self.encoding}' category '{category}'")
+        return span
+
+    def index_of(self, c: str, category: str | None = None) -> int:
+        if len(c) != 1:
+            raise self.exception_type('must be one character')
+        start, end = self._get_span(category)
+        code_point = ord(c)
+        ordinal = self.ordinals[code_point] - 1 if code_point < CATEGORY_TABLE_SIZE else -1
+        if not start <= ordinal < end:
+            if category is None:
+                raise self.exception_type(f"'\\u{code_point:x}' is not in the '{self.encoding}' alphabet")
+            raise self.exception_type(f"'\\u{code_point:x}' is not in the '{self.encoding}' category '{category}'")
+        return ordinal - start
+
+    def char_at(self, index: int, category: str | None = None) -> str:
+        start, end = self._get_span(category)
+        if not 0 <= index < end - start:
+            raise self.exception_type(f"index {index} is out of range, must between 0 and {end - start - 1}")
+        return self.alphabet[start + index]
+
+    def chars_in_unicode_range(self, start: int, end: int, category: str | None = None) -> list[str]:
+        if not 0 <= start <= end <= 0x10FFFF:
+            raise self.exception_type("'start' and 'end' must between 0x0 and 0x10ffff, and 'start' must not be greater than 'end'")
+        self._get_span(category)
+        sorted_alphabet = self.sorted_alphabets[category]
+        # 单个字符之间按码位比较，可以直接在字符串上二分查找
+        low = bisect.bisect_left(sorted_alphabet, chr(start))
+        high = bisect.bisect_right(sorted_alphabet, chr(end), low)
+        return list(sorted_alphabet[low:high])
+
+
+class CategoryCounter:
+    """
+    分块统计各类别的字符数和每个字符的出现次数
+    """
+    encoding: str
+    exception_type: type[Exception]
+    categories: list[str]
+    category_table: str
+    decoder: Any
+    category_counts: dict[str | None, int]
+    char_counts: collections.Counter[str]
+
+    def __init__(self, encoding: str, exception_type: type[Exception], categories: list[str], category_table: str, decoder: Any):
+        self.encoding = encoding
+        self.exception_type = exception_type
+        self.categories = categories
+        self.category_table = category_table
+        self.decoder = decoder
+        self.category_counts = dict.fromkeys([*categories, None, UNENCODABLE_CATEGORY], 0)
+        self.char_counts = collections.Counter()
+
+    def update(self, cs: str):
+        category_ids = cs.translate(self.category_table)
+        counted = 0
+        for category_id, category in enumerate(self.categories):
+            count = category_ids.count(chr(category_id))
+            self.category_counts[category] += count
+            counted += count
+        count = category_ids.count(chr(CATEGORY_ID_NONE))
+        self.category_counts[None] += count
+        # 基本多文种平面以外的字符经过 `str.translate` 后保持原样，也是无法编码的字符
+        self.category_counts[UNENCODABLE_CATEGORY] += len(cs) - counted - count
+        self.char_counts.update(cs)
+
+    def update_bytes(self, bs: bytes | bytearray, final: bool = False):
+        self.update(self.decoder.decode(bs, final))
+
+    def get_category_counts(self) -> dict[str | None, int]:
+        return dict(self.category_counts)
+
+    def most_common(self, n: int | None = None, category: str | None = None) -> list[tuple[str, int]]:
+        if category is None:
+            return self.char_counts.most_common(n)
+        if category not in self.categories:
+            raise self.exception_type(f"unknown '{self.encoding}' category '{category}'")
+        category_id = chr(self.categories.index(category))
+        items = [(c, count) for c, count in self.char_counts.items() if ord(c) < CATEGORY_TABLE_SIZE and self.category_table[ord(c)] == category_id]
+        if n is None:
+            return sorted(items, key=lambda item: item[1], reverse=True)
+        return heapq.nlargest(n, items, key=lambda item: item[1])
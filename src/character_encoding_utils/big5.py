@@ -1,3 +1,31 @@
+import re
+from collections.abc import AsyncIterator, Iterable, Iterator, Sequence
+from typing import TYPE_CHECKING
+
+from character_encoding_utils import _cache, _columnar, _packed, _records, _search, _shared, _tables
+from character_encoding_utils._concurrent import map_in_threads
+
+if TYPE_CHECKING:
+    import asyncio
+
+_HIGH_BYTES = bytes(range(0x80, 0x100))
+_ASCII_CHARS = ''.join(chr(code_point) for code_point in range(0x80))
+
+# Big5 与标准库 'big5' 编解码器的映射差异
+_OVERRIDES = [
+    ('〸', b'\xa2\xcc'),  # 0x3038
+    ('〹', b'\xa2\xcd'),  # 0x3039
+    ('〺', b'\xa2\xce'),  # 0x303A
+    ('十', b'\xa4\x51'),  # 0x5341
+    ('卅', b'\xa4\xca'),  # 0x5345
+    ('／', b'\xa1\xfe'),  # 0xFF0F
+    ('＼', b'\xa2\x40'),  # 0xFF3C
+    ('∕', b'\xa2\x41'),  # 0x2215
+    ('﹨', b'\xa2\x42'),  # 0xFE68
+]
+# Big5 不包含汉字的 '卄'
+_ILLEGAL_CHARS = '卄'  # 0x5344
+
 
 class Big5Exception(Exception):
     pass
@@ -34,40 +62,59 @@ class Big5DecodeError(Big5Exception):
             return f"'big5' codec can't decode bytes in position {self.position}-{self.position + len(self.obj) - 1}: {self.reason}"
 
 
-def encode(cs: str) -> bytes:
-    bs = bytearray()
-    for position, c in enumerate(cs):
-        match c:
-            case '〸':  # 0x3038
-                bs.extend(b'\xa2\xcc')
-            case '〹':  # 0x3039
-                bs.extend(b'\xa2\xcd')
-            case '〺':  # 0x303A
-                bs.extend(b'\xa2\xce')
-            case '十':  # 0x5341
-                bs.extend(b'\xa4\x51')
-            case '卄':  # 0x5344
-                # Big5 不包含汉字的 '卄'
-                raise Big5EncodeError(c, position, 'illegal multibyte sequence')
-            case '卅':  # 0x5345
-                bs.extend(b'\xa4\xca')
-            case '／':  # 0xFF0F
-                bs.extend(b'\xa1\xfe')
-            case '＼':  # 0xFF3C
-                bs.extend(b'\xa2\x40')
-            case '∕':  # 0x2215
-                bs.extend(b'\xa2\x41')
-            case '﹨':  # 0xFE68
-                bs.extend(b'\xa2\x42')
-            case _:
-                try:
-                    bs.extend(c.encode('big5'))
-                except UnicodeEncodeError as e:
-                    raise Big5EncodeError(c, position, e.reason) from e
-    return bytes(bs)
+def _compile_encode_overrides() -> dict[str, bytes | None]:
+    overrides = {}
+    for c, bs in _OVERRIDES:
+        try:
+            if c.encode('big5') == bs:
+                continue
+        except UnicodeEncodeError:
+            pass
+        overrides[c] = bs
+    for c in _ILLEGAL_CHARS:
+        overrides[c] = None
+    return overrides
 
 
-def decode(bs: bytes | bytearray) -> str:
+def _compile_decode_overrides() -> dict[bytes, str]:
+    overrides = {}
+    for c, bs in _OVERRIDES:
+        try:
+            if bs.decode('big5') == c:
+                continue
+        except UnicodeDecodeError:
+            pass
+        overrides[bs] = c
+    return overrides
+
+
+# 只保留与标准库不一致的映射
+_encode_overrides = _compile_encode_overrides()
+_decode_overrides = _compile_decode_overrides()
+_encode_override_pattern = re.compile('[' + re.escape(''.join(_encode_overrides)) + ']')
+_decode_override_pattern = re.compile(b'|'.join(re.escape(bs) for bs in _decode_overrides))
+
+
+def encode(cs: str) -> bytes:
+    chunks = []
+    cursor = 0
+    try:
+        for match in _encode_override_pattern.finditer(cs):
+            chunks.append(cs[cursor:match.start()].encode('big5'))
+            c = match.group()
+            bs = _encode_overrides[c]
+            if bs is None:
+                raise Big5EncodeError(c, match.start(), 'illegal multibyte sequence')
+            chunks.append(bs)
+            cursor = match.end()
+        chunks.append(cs[cursor:].encode('big5'))
+    except UnicodeEncodeError as e:
+        position = cursor + e.start
+        raise Big5EncodeError(cs[position], position, e.reason) from e
+    return b''.join(chunks)
+
+
+def _decode_by_characters(bs: bytes | bytearray) -> str:
     cs = []
     cursor = 0
     passed = 0
@@ -82,34 +129,164 @@ def decode(bs: bytes | bytearray) -> str:
                 bc.append(bs[cursor])
                 cursor += 1
 
-        match bc:
-            case b'\xa2\xcc':
-                cs.append('〸')  # 0x3038
-            case b'\xa2\xcd':
-                cs.append('〹')  # 0x3039
-            case b'\xa2\xce':
-                cs.append('〺')  # 0x303A
-            case b'\xa4\x51':
-                cs.append('十')  # 0x5341
-            case b'\xa4\xca':
-                cs.append('卅')  # 0x5345
-            case b'\xa1\xfe':
-                cs.append('／')  # 0xFF0F
-            case b'\xa2\x40':
-                cs.append('＼')  # 0xFF3C
-            case b'\xa2\x41':
-                cs.append('∕')  # 0x2215
-            case b'\xa2\x42':
-                cs.append('﹨')  # 0xFE68
-            case _:
-                try:
-                    cs.append(bc.decode('big5'))
-                except UnicodeDecodeError as e:
-                    raise Big5DecodeError(bc, passed, e.reason) from e
+        c = _decode_overrides.get(bytes(bc))
+        if c is None:
+            try:
+                c = bc.decode('big5')
+            except UnicodeDecodeError as e:
+                raise Big5DecodeError(bc, passed, e.reason) from e
+        cs.append(c)
         passed += len(bc)
     return ''.join(cs)
 
 
+def _iter_aligned_decode_overrides(bs: bytes | bytearray) -> Iterator[re.Match[bytes]]:
+    # 只保留位于字符边界上的字节对，已知的字符边界只会向后移动，整体开销与字节数成正比
+    boundary = 0
+    match = _decode_override_pattern.search(bs)
+    while match is not None:
+        boundary += _find_incomplete_start(bs[boundary:match.start()])
+        if boundary == match.start():
+            yield match
+            boundary = match.end()
+            match = _decode_override_pattern.search(bs, boundary)
+        else:
+            match = _decode_override_pattern.search(bs, match.start() + 1)
+
+
+def decode(bs: bytes | bytearray) -> str:
+    try:
+        # 先做一次不考虑字符边界的快速检查，绝大多数文本不需要处理映射差异
+        if _decode_override_pattern.search(bs) is None:
+            return bs.decode('big5')
+
+        cs = []
+        cursor = 0
+        for match in _iter_aligned_decode_overrides(bs):
+            cs.append(bs[cursor:match.start()].decode('big5'))
+            cs.append(_decode_overrides[match.group()])
+            cursor = match.end()
+        cs.append(bs[cursor:].decode('big5'))
+        return ''.join(cs)
+    except UnicodeDecodeError:
+        # 逐个字符重新解码，以得到准确的错误位置
+        return _decode_by_characters(bs)
+
+
+def _find_incomplete_start(bs: bytes) -> int:
+    # 小于等于 0x7F 的字节之后一定是字符边界，只需检查末尾连续高位字节的奇偶
+    high_count = len(bs) - len(bs.rstrip(_HIGH_BYTES))
+    if high_count % 2 == 1:
+        return len(bs) - 1
+    return len(bs)
+
+
+class IncrementalDecoder:
+    pending: bytes
+    passed: int
+
+    def __init__(self):
+        self.pending = b''
+        self.passed = 0
+
+    def decode(self, bs: bytes | bytearray, final: bool = False) -> str:
+        bs = self.pending + bs
+        end = len(bs) if final else _find_incomplete_start(bs)
+        try:
+            cs = decode(bs[:end])
+        except Big5DecodeError as e:
+            e.position += self.passed
+            raise
+        self.pending = bs[end:]
+        self.passed += end
+        return cs
+
+    def reset(self):
+        self.pending = b''
+        self.passed = 0
+
+
+class CodecCache(_cache.CodecCache):
+    def __init__(self, maxsize: int | None = 4096, max_length: int = 256):
+        super().__init__(encode, decode, maxsize, max_length)
+
+
+async def decode_stream(reader: 'asyncio.StreamReader', chunk_size: int = 8192) -> AsyncIterator[str]:
+    decoder = IncrementalDecoder()
+    while True:
+        bs = await reader.read(chunk_size)
+        cs = decoder.decode(bs, final=not bs)
+        if cs:
+            yield cs
+        if not bs:
+            break
+
+
+async def encode_stream(writer: 'asyncio.StreamWriter', cs: str):
+    writer.write(encode(cs))
+    await writer.drain()
+
+
+def encode_many(css: Iterable[str], workers: int | None = None) -> list[bytes]:
+    return map_in_threads(encode, css, workers)
+
+
+def decode_many(bss: Iterable[bytes | bytearray], workers: int | None = None) -> list[str]:
+    return map_in_threads(decode, bss, workers)
+
+
+def encode_columnar(css: Iterable[str]) -> tuple[bytes, list[int], list[Big5EncodeError | None]]:
+    return _columnar.encode_rows(encode, Big5EncodeError, css)
+
+
+def decode_columnar(bs: bytes | bytearray, offsets: Sequence[int]) -> tuple[list[str | None], list[Big5DecodeError | None]]:
+    return _columnar.decode_rows(decode, Big5DecodeError, bs, offsets)
+
+
+def truncate_to_bytes(cs: str, max_bytes: int) -> str:
+    return _records.truncate_to_bytes(encode, Big5EncodeError, cs, max_bytes)
+
+
+def encode_record(fields: Sequence[str], widths: Sequence[int], padding: bytes = b' ', truncate: bool = False) -> bytes:
+    return _records.encode_record(encode, Big5EncodeError, fields, widths, padding, truncate)
+
+
+def decode_record(bs: bytes | bytearray, widths: Sequence[int], padding: bytes = b' ') -> list[str]:
+    return _records.decode_record(decode, Big5DecodeError, bs, widths, padding)
+
+
+@_shared.cached_table
+def _get_packed_alphabet() -> str:
+    # 打包格式的码位空间：ASCII 字符和按编码排序的所有双字节字符
+    return _ASCII_CHARS + ''.join(c for _, c in iter_defined())
+
+
+@_shared.cached_table
+def _get_pack_table() -> str:
+    return _packed.build_pack_table(_get_packed_alphabet())
+
+
+def pack(cs: str) -> bytes:
+    """
+    打包为每个字符 14 位的紧凑格式
+    """
+    return _packed.pack(cs, _get_pack_table(), 'big5', Big5EncodeError)
+
+
+def unpack(bs: bytes | bytearray) -> str:
+    return _packed.unpack(bs, _get_packed_alphabet(), Big5DecodeError)
+
+
+class IncrementalPacker(_packed.IncrementalPacker):
+    def __init__(self):
+        super().__init__(_get_pack_table(), 'big5', Big5EncodeError)
+
+
+class IncrementalUnpacker(_packed.IncrementalUnpacker):
+    def __init__(self):
+        super().__init__(_get_packed_alphabet(), Big5DecodeError)
+
+
 def query_code(c: str) -> int:
     if len(c) != 1:
         raise Big5Exception('must be one character')
@@ -130,6 +307,15 @@ def query_chr(code: int) -> str:
         raise Big5Exception(f"'big5' code 0x{code:04X} is undefined") from e
 
 
+@_shared.cached_table
+def _get_defined_bitmap() -> bytes:
+    return _tables.build_defined_bitmap('big5', [int.from_bytes(bs, 'big') for bs in _decode_overrides])
+
+
+def iter_defined(code_start: int = 0xA140, code_end: int = 0xF9FE) -> Iterator[tuple[int, str]]:
+    return _tables.iter_defined(_get_defined_bitmap(), decode, code_start, code_end)
+
+
 def get_categories() -> list[str]:
     return ['other', 'level-1', 'level-2']
 
@@ -149,37 +335,91 @@ def query_category(c: str) -> str | None:
         return None
 
 
-def _build_alphabet_by_codes_between(code_start: int, code_end: int) -> list[str]:
-    alphabet = []
-    for code in range(code_start, code_end + 1):
-        try:
-            c = query_chr(code)
-            alphabet.append(c)
-        except Big5Exception:
-            pass
-    return alphabet
+def iter_runs(cs: str) -> Iterator[tuple[str | None, int, int]]:
+    category_ids = cs.translate(_get_category_table())
+    return _tables.iter_category_runs(category_ids, get_categories())
+
+
+def is_encodable(cs: str) -> bool:
+    return _tables.is_encodable(cs.translate(_get_category_table()))
+
+
+def find_unencodable(cs: str) -> list[tuple[int, str]]:
+    """
+    所有无法编码的字符及其位置
+    """
+    return _tables.find_unencodable(cs, cs.translate(_get_category_table()))
+
+
+def find(bs: bytes | bytearray, sub: str, start: int = 0, end: int | None = None) -> int:
+    """
+    在编码后的字节中查找 `sub`，返回字节位置，不存在时返回 -1
+    不解码整段字节，跳过不在字符边界上的匹配，`start` 需要位于字符边界
+    """
+    return next(finditer(bs, sub, start, end), -1)
 
 
-_alphabet_other = _build_alphabet_by_codes_between(0xA140, 0xA3BF)
-_alphabet_level_1 = _build_alphabet_by_codes_between(0xA440, 0xC67E)
-_alphabet_level_2 = _build_alphabet_by_codes_between(0xC940, 0xF9D5)
-_alphabet = _alphabet_other + _alphabet_level_1 + _alphabet_level_2
+def finditer(bs: bytes | bytearray, sub: str, start: int = 0, end: int | None = None) -> Iterator[int]:
+    return _search.finditer(encode, _find_incomplete_start, bs, sub, start, end)
+
+
+class CategoryCounter(_tables.CategoryCounter):
+    def __init__(self):
+        super().__init__('big5', Big5Exception, get_categories(), _get_category_table(), IncrementalDecoder())
+
+
+def sort_key(cs: str) -> bytes:
+    return _tables.build_sort_key(cs, _get_sort_key_table(), encode, Big5EncodeError)
+
+
+def sort_keys(css: Iterable[str]) -> list[bytes]:
+    return _tables.build_sort_keys(css, _get_sort_key_table(), encode, Big5EncodeError)
+
+
+def _build_alphabet_by_codes_between(code_start: int, code_end: int) -> str:
+    return ''.join(c for _, c in iter_defined(code_start, code_end))
+
+
+_alphabet_other = _shared.load(__name__, '_alphabet_other') or _build_alphabet_by_codes_between(0xA140, 0xA3BF)
+_alphabet_level_1 = _shared.load(__name__, '_alphabet_level_1') or _build_alphabet_by_codes_between(0xA440, 0xC67E)
+_alphabet_level_2 = _shared.load(__name__, '_alphabet_level_2') or _build_alphabet_by_codes_between(0xC940, 0xF9D5)
+
+
+@_shared.cached_table
+def _get_category_table() -> str:
+    # 常用字和次常用字之间还有一些不属于任何类别的双字节字符
+    uncategorized = _ASCII_CHARS + ''.join(_build_alphabet_by_codes_between(0xC67F, 0xC93F))
+    return _tables.build_category_table([_alphabet_other, _alphabet_level_1, _alphabet_level_2], uncategorized)
+
+
+@_shared.cached_table
+def _get_sort_key_table() -> str:
+    return _tables.build_sort_key_table(_get_category_table(), encode)
+
+
+@_shared.cached_table
+def _get_alphabet_index() -> _tables.AlphabetIndex:
+    return _tables.AlphabetIndex('big5', Big5Exception, {
+        'other': _alphabet_other,
+        'level-1': _alphabet_level_1,
+        'level-2': _alphabet_level_2,
+    })
 
 
 def get_alphabet_other() -> list[str]:
-    return _alphabet_other.copy()
+    return list(_alphabet_other)
 
 
 def get_alphabet_level_1() -> list[str]:
-    return _alphabet_level_1.copy()
+    return list(_alphabet_level_1)
 
 
 def get_alphabet_level_2() -> list[str]:
-    return _alphabet_level_2.copy()
+    return list(_alphabet_level_2)
 
 
 def get_alphabet() -> list[str]:
-    return _alphabet.copy()
+    return list(_alphabet_other + _alphabet_level_1 + _alphabet_level_2)
 
 
 def get_other_count() -> int:
@@ -195,4 +435,19 @@ def get_level_2_count() -> int:
 
 
 def get_count() -> int:
-    return len(_alphabet)
+    return len(_alphabet_other) + len(_alphabet_level_1) + len(_alphabet_level_2)
+
+
+def index_of(c: str, category: str | None = None) -> int:
+    return _get_alphabet_index().index_of(c, category)
+
+
+def char_at(index: int, category: str | None = None) -> str:
+    return _get_alphabet_index().char_at(index, category)
+
+
+def chars_in_unicode_range(start: int, end: int, category: str | None = None) -> list[str]:
+    """
+    字母表中码位在 `start` 与 `end` 之间（包含两端）的字符，按码位排序
+    """
+    return _get_alphabet_index().chars_in_unicode_range(start, end, category)
@@ -0,0 +1,120 @@
+import dataclasses
+import struct
+import sys
+from array import array
+from types import ModuleType
+from typing import BinaryIO
+
+from character_encoding_utils import big5, gb2312, ksx1001, shiftjis
+
+_MODULES: dict[str, ModuleType] = {
+    'gb2312': gb2312,
+    'big5': big5,
+    'shiftjis': shiftjis,
+    'ksx1001': ksx1001,
+}
+_DEFAULT_INTERVAL = 4096
+_CHUNK_SIZE = 64 * 1024
+# 索引文件头：魔数、编码名称、检查点间隔、字符数、字节数
+_HEADER = struct.Struct('<8s16sQQQ')
+_MAGIC = b'CEUIDX\x00\x01'
+
+
+class CheckpointException(Exception):
+    pass
+
+
+@dataclasses.dataclass(frozen=True)
+class CheckpointIndex:
+    encoding: str
+    interval: int
+    char_count: int
+    byte_count: int
+    # 第 i 个元素是第 i * interval 个字符的字节偏移
+    byte_offsets: array
+
+
+def build_index(file: BinaryIO, encoding: str, interval: int = _DEFAULT_INTERVAL) -> CheckpointIndex:
+    if encoding not in _MODULES:
+        raise CheckpointException(f"unknown encoding '{encoding}'")
+    if interval < 1:
+        raise CheckpointException("'interval' must be at least 1")
+    module = _MODULES[encoding]
+    decoder = module.IncrementalDecoder()
+    byte_offsets = array('Q', [0])
+    char_count = 0
+    byte_count = 0
+    while True:
+        bs = file.read(_CHUNK_SIZE)
+        cs = decoder.decode(bs, final=not bs)
+        # 解码结果重新编码后字节数不变，据此计算每个检查点的字节偏移
+        cursor = 0
+        while True:
+            step = len(byte_offsets) * interval - char_count
+            if cursor + step > len(cs):
+                break
+            byte_count += len(module.encode(cs[cursor:cursor + step]))
+            char_count += step
+            cursor += step
+            byte_offsets.append(byte_count)
+        byte_count += len(module.encode(cs[cursor:]))
+        char_count += len(cs) - cursor
+        if not bs:
+            break
+    return CheckpointIndex(encoding, interval, char_count, byte_count, byte_offsets)
+
+
+def dump_index(index: CheckpointIndex, file: BinaryIO):
+    file.write(_HEADER.pack(_MAGIC, index.encoding.encode('ascii'), index.interval, index.char_count, index.byte_count))
+    byte_offsets = array('Q', index.byte_offsets)
+    if sys.byteorder == 'big':
+        byte_offsets.byteswap()
+    file.write(byte_offsets.tobytes())
+
+
+def load_index(file: BinaryIO) -> CheckpointIndex:
+    header = file.read(_HEADER.size)
+    if len(header) != _HEADER.size:
+        raise CheckpointException('index file is truncated')
+    magic, encoding, interval, char_count, byte_count = _HEADER.unpack(header)
+    if magic != _MAGIC:
+        raise CheckpointException('not a checkpoint index file')
+    encoding = encoding.rstrip(b'\x00').decode('ascii')
+    if encoding not in _MODULES:
+        raise CheckpointException(f"unknown encoding '{encoding}'")
+    byte_offsets = array('Q')
+    data = file.read()
+    if len(data) != (char_count // interval + 1) * byte_offsets.itemsize:
+        raise CheckpointException('index file is truncated')
+    byte_offsets.frombytes(data)
+    if sys.byteorder == 'big':
+        byte_offsets.byteswap()
+    return CheckpointIndex(encoding, interval, char_count, byte_count, byte_offsets)
+
+
+def read_chars(file: BinaryIO, index: CheckpointIndex, start: int, end: int | None = None) -> str:
+    if end is None:
+        end = index.char_count
+    if not 0 <= start <= end <= index.char_count:
+        raise CheckpointException(f"character range [{start}, {end}) is out of bounds, file has {index.char_count} characters")
+
+    # 从最近的检查点开始解码，只读取需要的部分
+    checkpoint = start // index.interval
+    skip = start - checkpoint * index.interval
+    need = skip + (end - start)
+    file.seek(index.byte_offsets[checkpoint])
+    decoder = _MODULES[index.encoding].IncrementalDecoder()
+    decoder.passed = index.byte_offsets[checkpoint]
+    cs = []
+    char_count = 0
+    while char_count < need:
+        # 大多数字符不超过 2 个字节
+        bs = file.read((need - char_count) * 2 + 8)
+        chunk = decoder.decode(bs, final=not bs)
+        cs.append(chunk)
+        char_count += len(chunk)
+        if not bs:
+            break
+    if char_count < need:
+        raise CheckpointException('file is shorter than the index, the index may be stale')
+    return ''.join(cs)[skip:need]
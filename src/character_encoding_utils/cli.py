@@ -0,0 +1,291 @@
+import argparse
+import codecs
+import contextlib
+import fnmatch
+import functools
+import os
+import sys
+import time
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from types import ModuleType
+from typing import BinaryIO
+
+from character_encoding_utils import big5, gb2312, ksx1001, shiftjis
+
+_MODULES: dict[str, tuple[ModuleType, type[Exception]]] = {
+    'gb2312': (gb2312, gb2312.GB2312Exception),
+    'big5': (big5, big5.Big5Exception),
+    'shiftjis': (shiftjis, shiftjis.ShiftJISException),
+    'ksx1001': (ksx1001, ksx1001.KSX1001Exception),
+}
+_UTF_8 = 'utf-8'
+_ERRORS = ['strict', 'replace', 'ignore']
+_CHUNK_SIZE = 64 * 1024
+_DECODE_REPLACEMENT = '\ufffd'
+_ENCODE_REPLACEMENT = b'?'
+
+
+def _iter_file_paths(root_path: str, patterns: list[str] | None) -> Iterator[str]:
+    if os.path.isfile(root_path):
+        yield root_path
+        return
+    for dir_path, dir_names, file_names in os.walk(root_path):
+        dir_names.sort()
+        for file_name in sorted(file_names):
+            if patterns is None or any(fnmatch.fnmatch(file_name, pattern) for pattern in patterns):
+                yield os.path.join(dir_path, file_name)
+
+
+def _map_in_processes(func: Callable, items: Iterable, workers: int | None) -> Iterator:
+    if workers == 1:
+        yield from map(func, items)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(func, items, chunksize=16)
+
+
+def _format_throughput(byte_count: int, elapsed: float) -> str:
+    return f'{byte_count / max(elapsed, 1e-9) / 1024 / 1024:.2f} MiB/s'
+
+
+def _verify_file(encoding: str, file_path: str) -> tuple[str, int, str | None]:
+    module, exception_type = _MODULES[encoding]
+    try:
+        with open(file_path, 'rb') as file:
+            bs = file.read()
+    except OSError as e:
+        return file_path, 0, f'read failed: {e}'
+    try:
+        cs = module.decode(bs)
+    except exception_type as e:
+        return file_path, len(bs), f'decode failed: {e}'
+    try:
+        round_trip_bs = module.encode(cs)
+    except exception_type as e:
+        return file_path, len(bs), f'encode failed: {e}'
+    if round_trip_bs != bs:
+        position = next((i for i, (a, b) in enumerate(zip(bs, round_trip_bs)) if a != b), min(len(bs), len(round_trip_bs)))
+        return file_path, len(bs), f'round trip mismatch at byte {position}'
+    return file_path, len(bs), None
+
+
+def _run_verify(args: argparse.Namespace) -> int:
+    if not os.path.exists(args.path):
+        print(f"'path' does not exist: {args.path}", file=sys.stderr)
+        return 2
+    start = time.perf_counter()
+    file_count = 0
+    byte_count = 0
+    failed_count = 0
+    file_paths = _iter_file_paths(args.path, args.include)
+    for file_path, size, error in _map_in_processes(functools.partial(_verify_file, args.encoding), file_paths, args.workers):
+        file_count += 1
+        byte_count += size
+        if error is not None:
+            failed_count += 1
+            print(f'FAIL {file_path}: {error}')
+    elapsed = time.perf_counter() - start
+    print(f'verified {file_count} files, {byte_count} bytes in {elapsed:.2f}s ({_format_throughput(byte_count, elapsed)}), {failed_count} failed')
+    return 1 if failed_count > 0 else 0
+
+
+class _ConvertError(Exception):
+    pass
+
+
+class _Converter:
+    source_encoding: str
+    target_encoding: str
+    errors: str
+    pending: bytes
+    passed_bytes: int
+    passed_chars: int
+
+    def __init__(self, source_encoding: str, target_encoding: str, errors: str):
+        self.source_encoding = source_encoding
+        self.target_encoding = target_encoding
+        self.errors = errors
+        self.pending = b''
+        self.passed_bytes = 0
+        self.passed_chars = 0
+        if source_encoding == _UTF_8:
+            self.utf_8_decoder = codecs.getincrementaldecoder(_UTF_8)(errors)
+
+    def _decode_utf_8(self, bs: bytes, final: bool) -> str:
+        # 标准库解码器内部缓存了不完整的字符，错误位置相对于缓存的起点
+        buffered_count = len(self.utf_8_decoder.getstate()[0])
+        try:
+            cs = self.utf_8_decoder.decode(bs, final)
+        except UnicodeDecodeError as e:
+            raise _ConvertError(f'decode failed at byte {self.passed_bytes - buffered_count + e.start}: {e.reason}') from e
+        self.passed_bytes += len(bs)
+        return cs
+
+    def _decode(self, bs: bytes, final: bool) -> str:
+        if self.source_encoding == _UTF_8:
+            return self._decode_utf_8(bs, final)
+        module, exception_type = _MODULES[self.source_encoding]
+        bs = self.pending + bs
+        end = len(bs) if final else module._find_incomplete_start(bs)
+        cs = []
+        cursor = 0
+        while True:
+            try:
+                cs.append(module.decode(bs[cursor:end]))
+                break
+            except exception_type as e:
+                if self.errors == 'strict':
+                    raise _ConvertError(f'decode failed at byte {self.passed_bytes + cursor + e.position}: {e.reason}') from e
+                # 跳过出错的字节后继续解码
+                cs.append(module.decode(bs[cursor:cursor + e.position]))
+                if self.errors == 'replace':
+                    cs.append(_DECODE_REPLACEMENT)
+                cursor += e.position + len(e.obj)
+        self.pending = bs[end:]
+        self.passed_bytes += end
+        return ''.join(cs)
+
+    def _encode(self, cs: str) -> bytes:
+        if self.target_encoding == _UTF_8:
+            return cs.encode(_UTF_8)
+        module, exception_type = _MODULES[self.target_encoding]
+        bs = []
+        cursor = 0
+        while True:
+            try:
+                bs.append(module.encode(cs[cursor:]))
+                break
+            except exception_type as e:
+                if self.errors == 'strict':
+                    raise _ConvertError(f'encode failed at character {self.passed_chars + cursor + e.position}: {e.reason}') from e
+                # 跳过无法编码的字符后继续编码
+                bs.append(module.encode(cs[cursor:cursor + e.position]))
+                if self.errors == 'replace':
+                    bs.append(_ENCODE_REPLACEMENT)
+                cursor += e.position + 1
+        self.passed_chars += len(cs)
+        return b''.join(bs)
+
+    def convert(self, bs: bytes, final: bool = False) -> bytes:
+        return self._encode(self._decode(bs, final))
+
+
+def _convert_stream(converter: _Converter, source_file: BinaryIO, target_file: BinaryIO) -> int:
+    byte_count = 0
+    while True:
+        bs = source_file.read(_CHUNK_SIZE)
+        byte_count += len(bs)
+        target_file.write(converter.convert(bs, final=not bs))
+        if not bs:
+            break
+    return byte_count
+
+
+def _convert_file(source_encoding: str, target_encoding: str, errors: str, file_paths: tuple[str, str]) -> tuple[str, int, str | None]:
+    source_path, target_path = file_paths
+    converter = _Converter(source_encoding, target_encoding, errors)
+    try:
+        os.makedirs(os.path.dirname(target_path) or '.', exist_ok=True)
+        with open(source_path, 'rb') as source_file, open(target_path, 'wb') as target_file:
+            byte_count = _convert_stream(converter, source_file, target_file)
+    except OSError as e:
+        return source_path, converter.passed_bytes, f'io failed: {e}'
+    except _ConvertError as e:
+        os.remove(target_path)
+        return source_path, converter.passed_bytes, str(e)
+    return source_path, byte_count, None
+
+
+def _iter_convert_file_paths(source_path: str, target_path: str, patterns: list[str] | None) -> Iterator[tuple[str, str]]:
+    if os.path.isfile(source_path):
+        yield source_path, target_path
+        return
+    for file_path in _iter_file_paths(source_path, patterns):
+        yield file_path, os.path.join(target_path, os.path.relpath(file_path, source_path))
+
+
+def _run_convert_stream(args: argparse.Namespace, start: float) -> int:
+    converter = _Converter(args.source_encoding, args.target_encoding, args.errors)
+    try:
+        with contextlib.ExitStack() as stack:
+            source_file = sys.stdin.buffer if args.source == '-' else stack.enter_context(open(args.source, 'rb'))
+            target_file = sys.stdout.buffer if args.target == '-' else stack.enter_context(open(args.target, 'wb'))
+            byte_count = _convert_stream(converter, source_file, target_file)
+            target_file.flush()
+    except (OSError, _ConvertError) as e:
+        print(f'FAIL {args.source}: {e}', file=sys.stderr)
+        return 1
+    elapsed = time.perf_counter() - start
+    print(f'converted 1 files, {byte_count} bytes in {elapsed:.2f}s ({_format_throughput(byte_count, elapsed)}), 0 failed', file=sys.stderr)
+    return 0
+
+
+def _run_convert(args: argparse.Namespace) -> int:
+    if args.source != '-' and not os.path.exists(args.source):
+        print(f"'source' does not exist: {args.source}", file=sys.stderr)
+        return 2
+    start = time.perf_counter()
+    if args.source == '-' or args.target == '-':
+        # 标准输入输出只能转换单个流
+        return _run_convert_stream(args, start)
+
+    source_path = os.path.abspath(args.source)
+    target_path = os.path.abspath(args.target)
+    if os.path.isdir(source_path) and os.path.commonpath([source_path, target_path]) == source_path:
+        print("'target' must not be inside 'source'", file=sys.stderr)
+        return 2
+    if source_path == target_path:
+        print("'target' must not be the same as 'source'", file=sys.stderr)
+        return 2
+
+    file_count = 0
+    byte_count = 0
+    failed_count = 0
+    file_paths = _iter_convert_file_paths(args.source, args.target, args.include)
+    convert_file = functools.partial(_convert_file, args.source_encoding, args.target_encoding, args.errors)
+    for file_path, size, error in _map_in_processes(convert_file, file_paths, args.workers):
+        file_count += 1
+        byte_count += size
+        if error is not None:
+            failed_count += 1
+            print(f'FAIL {file_path}: {error}', file=sys.stderr)
+        elif args.verbose:
+            print(f'OK {file_path} ({size} bytes)', file=sys.stderr)
+    elapsed = time.perf_counter() - start
+    print(f'converted {file_count} files, {byte_count} bytes in {elapsed:.2f}s ({_format_throughput(byte_count, elapsed)}), {failed_count} failed', file=sys.stderr)
+    return 1 if failed_count > 0 else 0
+
+
+def _build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='character_encoding_utils')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    verify_parser = subparsers.add_parser('verify', help='decode and re-encode every file and report files that do not round trip')
+    verify_parser.add_argument('path', help='file or directory to verify')
+    verify_parser.add_argument('-e', '--encoding', choices=list(_MODULES), required=True)
+    verify_parser.add_argument('-i', '--include', action='append', metavar='PATTERN', help='only verify file names matching this glob pattern, can be repeated')
+    verify_parser.add_argument('-w', '--workers', type=int, default=None, help='number of worker processes, defaults to the number of CPUs')
+    verify_parser.set_defaults(handler=_run_verify)
+
+    encodings = [_UTF_8, *_MODULES]
+    convert_parser = subparsers.add_parser('convert', help='convert a file or every file in a directory between encodings')
+    convert_parser.add_argument('source', help="file or directory to convert, '-' for standard input")
+    convert_parser.add_argument('target', help="output file or directory, '-' for standard output")
+    convert_parser.add_argument('-f', '--from', dest='source_encoding', choices=encodings, required=True)
+    convert_parser.add_argument('-t', '--to', dest='target_encoding', choices=encodings, required=True)
+    convert_parser.add_argument('-e', '--errors', choices=_ERRORS, default='strict', help="'replace' writes U+FFFD for undecodable bytes and '?' for unencodable characters")
+    convert_parser.add_argument('-i', '--include', action='append', metavar='PATTERN', help='only convert file names matching this glob pattern, can be repeated')
+    convert_parser.add_argument('-w', '--workers', type=int, default=None, help='number of worker processes, defaults to the number of CPUs')
+    convert_parser.add_argument('-v', '--verbose', action='store_true', help='report every converted file')
+    convert_parser.set_defaults(handler=_run_convert)
+
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = _build_parser().parse_args(argv)
+    if args.workers is not None and args.workers < 1:
+        print("'workers' must be at least 1", file=sys.stderr)
+        return 2
+    return args.handler(args)
@@ -0,0 +1,104 @@
+import codecs
+import dataclasses
+from types import ModuleType
+
+from character_encoding_utils import big5, gb2312, ksx1001, shiftjis
+
+_DEFAULT_SAMPLE_SIZE = 64 * 1024
+_BLOCK_SIZE = 4096
+# 错误字符超过这个比例后提前放弃该编码
+_MAX_ERROR_RATE = 0.2
+_REPLACEMENT_CHARACTER = '\ufffd'
+
+
+class _Encoding:
+    name: str
+    module: ModuleType
+    codec: str
+    weights: dict[str, float]
+
+    def __init__(self, name: str, module: ModuleType, codec: str, weights: dict[str, float]):
+        self.name = name
+        self.module = module
+        self.codec = codec
+        self.weights = weights
+
+
+# 各类别字符的权重，常用字权重高，生僻字和符号权重低，不在权重表中的类别（如 ASCII）不参与计分
+_ENCODINGS = [
+    _Encoding('gb2312', gb2312, 'gb2312', {
+        'other': 0.5,
+        'level-1': 0.95,
+        'level-2': 0.5,
+    }),
+    _Encoding('big5', big5, 'big5', {
+        'other': 0.5,
+        'level-1': 0.95,
+        'level-2': 0.5,
+    }),
+    _Encoding('shiftjis', shiftjis, 'shift-jis', {
+        'single-byte-half-width-katakana': 0.2,
+        'double-byte-other': 1.0,
+        'double-byte-kanji': 0.9,
+    }),
+    _Encoding('ksx1001', ksx1001, 'ksx1001', {
+        'other': 0.5,
+        'syllable': 1.0,
+        'hanja': 0.3,
+    }),
+]
+
+
+@dataclasses.dataclass(frozen=True)
+class Candidate:
+    encoding: str
+    score: float
+    error_count: int
+    category_counts: dict[str, int]
+
+
+def _evaluate(encoding: _Encoding, sample: bytes, final: bool) -> Candidate:
+    categories = encoding.module.get_categories()
+    category_table = encoding.module._get_category_table()
+    category_counts = dict.fromkeys(categories, 0)
+    error_count = 0
+    char_count = 0
+
+    decoder = codecs.getincrementaldecoder(encoding.codec)(errors='replace')
+    for start in range(0, len(sample), _BLOCK_SIZE):
+        end = start + _BLOCK_SIZE
+        text = decoder.decode(sample[start:end], final and end >= len(sample))
+        char_count += len(text)
+        error_count += text.count(_REPLACEMENT_CHARACTER)
+        category_ids = text.translate(category_table)
+        for category_id, category in enumerate(categories):
+            category_counts[category] += category_ids.count(chr(category_id))
+        if error_count > char_count * _MAX_ERROR_RATE:
+            break
+
+    weighted_count = 0.0
+    scored_count = error_count
+    for category, weight in encoding.weights.items():
+        weighted_count += category_counts[category] * weight
+        scored_count += category_counts[category]
+    if scored_count == 0:
+        score = 1.0
+    else:
+        score = max(0.0, weighted_count - error_count) / scored_count
+    return Candidate(encoding.name, score, error_count, category_counts)
+
+
+def detect(data: bytes | bytearray, sample_size: int | None = _DEFAULT_SAMPLE_SIZE) -> list[Candidate]:
+    if sample_size is not None and len(data) > sample_size:
+        sample = bytes(data[:sample_size])
+        final = False
+    else:
+        sample = bytes(data)
+        final = True
+
+    if sample.isascii():
+        return [Candidate(encoding.name, 1.0, 0, dict.fromkeys(encoding.module.get_categories(), 0)) for encoding in _ENCODINGS]
+
+    candidates = [_evaluate(encoding, sample, final) for encoding in _ENCODINGS]
+    candidates.sort(key=lambda candidate: (-candidate.score, candidate.error_count))
+    return candidates
@@ -1,5 +1,15 @@
+from collections.abc import AsyncIterator, Iterable, Iterator, Sequence
+from typing import TYPE_CHECKING
+
+from character_encoding_utils import _cache, _columnar, _packed, _records, _search, _shared, _tables
+from character_encoding_utils._concurrent import map_in_threads
+
+if TYPE_CHECKING:
+    import asyncio
 
 _EUC_OFFSET = 0xA0
+_HIGH_BYTES = bytes(range(0x80, 0x100))
+_ASCII_CHARS = ''.join(chr(code_point) for code_point in range(0x80))
 
 
 class GB2312Exception(Exception):
@@ -38,16 +48,13 @@ class GB2312DecodeError(GB2312Exception):
 
 
 def encode(cs: str) -> bytes:
-    bs = bytearray()
-    for position, c in enumerate(cs):
-        try:
-            bs.extend(c.encode('gb2312'))
-        except UnicodeEncodeError as e:
-            raise GB2312EncodeError(c, position, e.reason) from e
-    return bytes(bs)
+    try:
+        return cs.encode('gb2312')
+    except UnicodeEncodeError as e:
+        raise GB2312EncodeError(cs[e.start], e.start, e.reason) from e
 
 
-def decode(bs: bytes | bytearray) -> str:
+def _decode_by_characters(bs: bytes | bytearray) -> str:
     cs = []
     cursor = 0
     passed = 0
@@ -70,6 +77,128 @@ def decode(bs: bytes | bytearray) -> str:
     return ''.join(cs)
 
 
+def decode(bs: bytes | bytearray) -> str:
+    try:
+        return bs.decode('gb2312')
+    except UnicodeDecodeError:
+        # 逐个字符重新解码，以得到准确的错误位置
+        return _decode_by_characters(bs)
+
+
+def _find_incomplete_start(bs: bytes) -> int:
+    # 小于等于 0x7F 的字节之后一定是字符边界，只需检查末尾连续高位字节的奇偶
+    high_count = len(bs) - len(bs.rstrip(_HIGH_BYTES))
+    if high_count % 2 == 1:
+        return len(bs) - 1
+    return len(bs)
+
+
+class IncrementalDecoder:
+    pending: bytes
+    passed: int
+
+    def __init__(self):
+        self.pending = b''
+        self.passed = 0
+
+    def decode(self, bs: bytes | bytearray, final: bool = False) -> str:
+        bs = self.pending + bs
+        end = len(bs) if final else _find_incomplete_start(bs)
+        try:
+            cs = decode(bs[:end])
+        except GB2312DecodeError as e:
+            e.position += self.passed
+            raise
+        self.pending = bs[end:]
+        self.passed += end
+        return cs
+
+    def reset(self):
+        self.pending = b''
+        self.passed = 0
+
+
+class CodecCache(_cache.CodecCache):
+    def __init__(self, maxsize: int | None = 4096, max_length: int = 256):
+        super().__init__(encode, decode, maxsize, max_length)
+
+
+async def decode_stream(reader: 'asyncio.StreamReader', chunk_size: int = 8192) -> AsyncIterator[str]:
+    decoder = IncrementalDecoder()
+    while True:
+        bs = await reader.read(chunk_size)
+        cs = decoder.decode(bs, final=not bs)
+        if cs:
+            yield cs
+        if not bs:
+            break
+
+
+async def encode_stream(writer: 'asyncio.StreamWriter', cs: str):
+    writer.write(encode(cs))
+    await writer.drain()
+
+
+def encode_many(css: Iterable[str], workers: int | None = None) -> list[bytes]:
+    return map_in_threads(encode, css, workers)
+
+
+def decode_many(bss: Iterable[bytes | bytearray], workers: int | None = None) -> list[str]:
+    return map_in_threads(decode, bss, workers)
+
+
+def encode_columnar(css: Iterable[str]) -> tuple[bytes, list[int], list[GB2312EncodeError | None]]:
+    return _columnar.encode_rows(encode, GB2312EncodeError, css)
+
+
+def decode_columnar(bs: bytes | bytearray, offsets: Sequence[int]) -> tuple[list[str | None], list[GB2312DecodeError | None]]:
+    return _columnar.decode_rows(decode, GB2312DecodeError, bs, offsets)
+
+
+def truncate_to_bytes(cs: str, max_bytes: int) -> str:
+    return _records.truncate_to_bytes(encode, GB2312EncodeError, cs, max_bytes)
+
+
+def encode_record(fields: Sequence[str], widths: Sequence[int], padding: bytes = b' ', truncate: bool = False) -> bytes:
+    return _records.encode_record(encode, GB2312EncodeError, fields, widths, padding, truncate)
+
+
+def decode_record(bs: bytes | bytearray, widths: Sequence[int], padding: bytes = b' ') -> list[str]:
+    return _records.decode_record(decode, GB2312DecodeError, bs, widths, padding)
+
+
+@_shared.cached_table
+def _get_packed_alphabet() -> str:
+    # 打包格式的码位空间：ASCII 字符和按编码排序的所有双字节字符
+    return _ASCII_CHARS + ''.join(c for _, c in iter_defined())
+
+
+@_shared.cached_table
+def _get_pack_table() -> str:
+    return _packed.build_pack_table(_get_packed_alphabet())
+
+
+def pack(cs: str) -> bytes:
+    """
+    打包为每个字符 14 位的紧凑格式
+    """
+    return _packed.pack(cs, _get_pack_table(), 'gb2312', GB2312EncodeError)
+
+
+def unpack(bs: bytes | bytearray) -> str:
+    return _packed.unpack(bs, _get_packed_alphabet(), GB2312DecodeError)
+
+
+class IncrementalPacker(_packed.IncrementalPacker):
+    def __init__(self):
+        super().__init__(_get_pack_table(), 'gb2312', GB2312EncodeError)
+
+
+class IncrementalUnpacker(_packed.IncrementalUnpacker):
+    def __init__(self):
+        super().__init__(_get_packed_alphabet(), GB2312DecodeError)
+
+
 def query_coord(c: str) -> tuple[int, int]:
     if len(c) != 1:
         raise GB2312Exception('must be one character')
@@ -93,6 +222,20 @@ def query_chr(row: int, col: int) -> str:
         raise GB2312Exception(f"'gb2312' coord at ({row}, {col}) is undefined'") from e
 
 
+@_shared.cached_table
+def _get_defined_bitmap() -> bytes:
+    return _tables.build_defined_bitmap('gb2312')
+
+
+def iter_defined(row_start: int = 1, row_end: int = 94) -> Iterator[tuple[tuple[int, int], str]]:
+    if row_start < 1 or row_end > 94:
+        raise GB2312Exception(f"'row_start' and 'row_end' must between 1 and 94")
+    code_start = (row_start + _EUC_OFFSET) << 8
+    code_end = (row_end + _EUC_OFFSET) << 8 | 0xFF
+    for code, c in _tables.iter_defined(_get_defined_bitmap(), decode, code_start, code_end):
+        yield ((code >> 8) - _EUC_OFFSET, (code & 0xFF) - _EUC_OFFSET), c
+
+
 def get_categories() -> list[str]:
     return ['other', 'level-1', 'level-2']
 
@@ -112,38 +255,89 @@ def query_category(c: str) -> str | None:
         return None
 
 
-def _build_alphabet_by_rows_between(row_start: int, row_end: int) -> list[str]:
-    alphabet = []
-    for row in range(row_start, row_end + 1):
-        for col in range(1, 94 + 1):
-            try:
-                c = query_chr(row, col)
-                alphabet.append(c)
-            except GB2312Exception:
-                pass
-    return alphabet
+def iter_runs(cs: str) -> Iterator[tuple[str | None, int, int]]:
+    category_ids = cs.translate(_get_category_table())
+    return _tables.iter_category_runs(category_ids, get_categories())
+
+
+def is_encodable(cs: str) -> bool:
+    return _tables.is_encodable(cs.translate(_get_category_table()))
+
+
+def find_unencodable(cs: str) -> list[tuple[int, str]]:
+    """
+    所有无法编码的字符及其位置
+    """
+    return _tables.find_unencodable(cs, cs.translate(_get_category_table()))
+
+
+def find(bs: bytes | bytearray, sub: str, start: int = 0, end: int | None = None) -> int:
+    """
+    在编码后的字节中查找 `sub`，返回字节位置，不存在时返回 -1
+    不解码整段字节，跳过不在字符边界上的匹配，`start` 需要位于字符边界
+    """
+    return next(finditer(bs, sub, start, end), -1)
+
+
+def finditer(bs: bytes | bytearray, sub: str, start: int = 0, end: int | None = None) -> Iterator[int]:
+    return _search.finditer(encode, _find_incomplete_start, bs, sub, start, end)
 
 
-_alphabet_other = _build_alphabet_by_rows_between(1, 9)
-_alphabet_level_1 = _build_alphabet_by_rows_between(16, 55)
-_alphabet_level_2 = _build_alphabet_by_rows_between(56, 87)
-_alphabet = _alphabet_other + _alphabet_level_1 + _alphabet_level_2
+class CategoryCounter(_tables.CategoryCounter):
+    def __init__(self):
+        super().__init__('gb2312', GB2312Exception, get_categories(), _get_category_table(), IncrementalDecoder())
+
+
+def sort_key(cs: str) -> bytes:
+    return _tables.build_sort_key(cs, _get_sort_key_table(), encode, GB2312EncodeError)
+
+
+def sort_keys(css: Iterable[str]) -> list[bytes]:
+    return _tables.build_sort_keys(css, _get_sort_key_table(), encode, GB2312EncodeError)
+
+
+def _build_alphabet_by_rows_between(row_start: int, row_end: int) -> str:
+    return ''.join(c for _, c in iter_defined(row_start, row_end))
+
+
+_alphabet_other = _shared.load(__name__, '_alphabet_other') or _build_alphabet_by_rows_between(1, 9)
+_alphabet_level_1 = _shared.load(__name__, '_alphabet_level_1') or _build_alphabet_by_rows_between(16, 55)
+_alphabet_level_2 = _shared.load(__name__, '_alphabet_level_2') or _build_alphabet_by_rows_between(56, 87)
+
+
+@_shared.cached_table
+def _get_category_table() -> str:
+    return _tables.build_category_table([_alphabet_other, _alphabet_level_1, _alphabet_level_2], _ASCII_CHARS)
+
+
+@_shared.cached_table
+def _get_sort_key_table() -> str:
+    return _tables.build_sort_key_table(_get_category_table(), encode)
+
+
+@_shared.cached_table
+def _get_alphabet_index() -> _tables.AlphabetIndex:
+    return _tables.AlphabetIndex('gb2312', GB2312Exception, {
+        'other': _alphabet_other,
+        'level-1': _alphabet_level_1,
+        'level-2': _alphabet_level_2,
+    })
 
 
 def get_alphabet_other() -> list[str]:
-    return _alphabet_other.copy()
+    return list(_alphabet_other)
 
 
 def get_alphabet_level_1() -> list[str]:
-    return _alphabet_level_1.copy()
+    return list(_alphabet_level_1)
 
 
 def get_alphabet_level_2() -> list[str]:
-    return _alphabet_level_2.copy()
+    return list(_alphabet_level_2)
 
 
 def get_alphabet() -> list[str]:
-    return _alphabet.copy()
+    return list(_alphabet_other + _alphabet_level_1 + _alphabet_level_2)
 
 
 def get_other_count() -> int:
@@ -159,4 +353,19 @@ def get_level_2_count() -> int:
 
 
 def get_count() -> int:
-    return len(_alphabet)
+    return len(_alphabet_other) + len(_alphabet_level_1) + len(_alphabet_level_2)
+
+
+def index_of(c: str, category: str | None = None) -> int:
+    return _get_alphabet_index().index_of(c, category)
+
+
+def char_at(index: int, category: str | None = None) -> str:
+    return _get_alphabet_index().char_at(index, category)
+
+
+def chars_in_unicode_range(start: int, end: int, category: str | None = None) -> list[str]:
+    """
+    字母表中码位在 `start` 与 `end` 之间（包含两端）的字符，按码位排序
+    """
+    return _get_alphabet_index().chars_in_unicode_range(start, end, category)
@@ -1,5 +1,19 @@
+import re
+from collections.abc import AsyncIterator, Iterable, Iterator, Sequence
+from typing import TYPE_CHECKING
+
+from character_encoding_utils import _cache, _columnar, _packed, _records, _search, _shared, _tables
+from character_encoding_utils._concurrent import map_in_threads
+
+if TYPE_CHECKING:
+    import asyncio
 
 _EUC_OFFSET = 0xA0
+_HIGH_BYTES = bytes(range(0x80, 0x100))
+_ASCII_CHARS = ''.join(chr(code_point) for code_point in range(0x80))
+_INCOMPLETE_FILLER_PATTERN = re.compile(rb'\xa4\xd4(?:\xa4[\xa1-\xd4]){0,2}\Z')
+_FILLER_SEQUENCE_PATTERN = re.compile(rb'\xa4\xd4(?:\xa4[\xa1-\xd4]){3}')
+_TAIL_PATTERN = re.compile(rb'(?:\xa4\xd4(?:\xa4[\xa1-\xd4]){3}|[\x80-\xff]{2})*?(?=[\x80-\xff]{0,6}\Z)')
 
 
 class KSX1001Exception(Exception):
@@ -38,16 +52,13 @@ class KSX1001DecodeError(KSX1001Exception):
 
 
 def encode(cs: str) -> bytes:
-    bs = bytearray()
-    for position, c in enumerate(cs):
-        try:
-            bs.extend(c.encode('ksx1001'))
-        except UnicodeEncodeError as e:
-            raise KSX1001EncodeError(c, position, e.reason) from e
-    return bytes(bs)
+    try:
+        return cs.encode('ksx1001')
+    except UnicodeEncodeError as e:
+        raise KSX1001EncodeError(cs[e.start], e.start, e.reason) from e
 
 
-def decode(bs: bytes | bytearray) -> str:
+def _decode_by_characters(bs: bytes | bytearray) -> str:
     cs = []
     cursor = 0
     passed = 0
@@ -84,6 +95,181 @@ def decode(bs: bytes | bytearray) -> str:
     return ''.join(cs)
 
 
+def _iter_aligned_fillers(bs: bytes | bytearray, start: int = 0, end: int | None = None) -> Iterator[tuple[int, bytes | bytearray]]:
+    # 只保留位于字符边界上的 Hangul Filler，已知的字符边界只会向后移动，整体开销与字节数成正比
+    # `start` 需要位于字符边界，超出 `end` 的 8 字节序列视为单独出现的 Hangul Filler
+    end = len(bs) if end is None else end
+    boundary = start
+    start = bs.find(b'\xa4\xd4', boundary, end)
+    while start != -1:
+        # 小于等于 0x7F 的字节之后一定是字符边界，只需检查之前连续高位字节的奇偶
+        gap = bs[boundary:start]
+        if (len(gap) - len(gap.rstrip(_HIGH_BYTES))) % 2 == 0:
+            match = _FILLER_SEQUENCE_PATTERN.match(bs, start, end)
+            boundary = start + 2 if match is None else match.end()
+            yield start, bs[start:boundary]
+            start = bs.find(b'\xa4\xd4', boundary, end)
+        else:
+            boundary = start - 1
+            start = bs.find(b'\xa4\xd4', start + 1, end)
+
+
+def decode(bs: bytes | bytearray) -> str:
+    # 标准库可以直接解码 8 字节的组合音节，但不能解码单独出现的 Hangul Filler
+    try:
+        return bs.decode('ksx1001')
+    except UnicodeDecodeError as e:
+        # 出错的位置不是 Hangul Filler 时一定无法解码，直接逐个字符解码以得到准确的错误位置
+        if bs[e.start:e.start + 2] != b'\xa4\xd4':
+            return _decode_by_characters(bs)
+
+    try:
+        cs = []
+        cursor = 0
+        for start, sequence in _iter_aligned_fillers(bs):
+            cs.append(bs[cursor:start].decode('ksx1001'))
+            if len(sequence) == 2:
+                cs.append(chr(0x3164))  # Hangul Filler
+            else:
+                syllable = _compose_filler_syllable(sequence)
+                if syllable is None:
+                    return _decode_by_characters(bs)
+                cs.append(syllable)
+            cursor = start + len(sequence)
+        cs.append(bs[cursor:].decode('ksx1001'))
+        return ''.join(cs)
+    except UnicodeDecodeError:
+        # 逐个字符重新解码，以得到准确的错误位置
+        return _decode_by_characters(bs)
+
+
+def _find_incomplete_character_start(bs: bytes) -> int:
+    # 小于等于 0x7F 的字节之后一定是字符边界，只需检查末尾连续高位字节的奇偶
+    high_count = len(bs) - len(bs.rstrip(_HIGH_BYTES))
+    return len(bs) - 1 if high_count % 2 == 1 else len(bs)
+
+
+def _find_incomplete_start(bs: bytes) -> int:
+    end = _find_incomplete_character_start(bs)
+    # 末尾可能是尚未接收完整的 8 字节 Hangul Filler 序列，没有终声的完整音节也以 Hangul Filler 结尾，
+    # 需要从字符边界开始向后确认每个 Hangul Filler 的位置
+    # Hangul Filler 序列只由第一位字节为 0xA4 的双字节字符组成，从末尾连续的这类字符之前开始，
+    # 先由正则按解码的方式划分，直到剩余不超过 6 个字节
+    run_start = len(bs.rstrip(_HIGH_BYTES))
+    start = run_start + len(bs[run_start:end:2].rstrip(b'\xa4')) * 2
+    start = _TAIL_PATTERN.match(bs, start, end).end()
+    for start, sequence in _iter_aligned_fillers(bs, start, end):
+        if len(sequence) == 2 and _INCOMPLETE_FILLER_PATTERN.match(bs, start, end) is not None:
+            return start
+    return end
+
+
+class IncrementalDecoder:
+    pending: bytes
+    passed: int
+
+    def __init__(self):
+        self.pending = b''
+        self.passed = 0
+
+    def decode(self, bs: bytes | bytearray, final: bool = False) -> str:
+        bs = self.pending + bs
+        end = len(bs) if final else _find_incomplete_start(bs)
+        try:
+            cs = decode(bs[:end])
+        except KSX1001DecodeError as e:
+            e.position += self.passed
+            raise
+        self.pending = bs[end:]
+        self.passed += end
+        return cs
+
+    def reset(self):
+        self.pending = b''
+        self.passed = 0
+
+
+class CodecCache(_cache.CodecCache):
+    def __init__(self, maxsize: int | None = 4096, max_length: int = 256):
+        super().__init__(encode, decode, maxsize, max_length)
+
+
+async def decode_stream(reader: 'asyncio.StreamReader', chunk_size: int = 8192) -> AsyncIterator[str]:
+    decoder = IncrementalDecoder()
+    while True:
+        bs = await reader.read(chunk_size)
+        cs = decoder.decode(bs, final=not bs)
+        if cs:
+            yield cs
+        if not bs:
+            break
+
+
+async def encode_stream(writer: 'asyncio.StreamWriter', cs: str):
+    writer.write(encode(cs))
+    await writer.drain()
+
+
+def encode_many(css: Iterable[str], workers: int | None = None) -> list[bytes]:
+    return map_in_threads(encode, css, workers)
+
+
+def decode_many(bss: Iterable[bytes | bytearray], workers: int | None = None) -> list[str]:
+    return map_in_threads(decode, bss, workers)
+
+
+def encode_columnar(css: Iterable[str]) -> tuple[bytes, list[int], list[KSX1001EncodeError | None]]:
+    return _columnar.encode_rows(encode, KSX1001EncodeError, css)
+
+
+def decode_columnar(bs: bytes | bytearray, offsets: Sequence[int]) -> tuple[list[str | None], list[KSX1001DecodeError | None]]:
+    return _columnar.decode_rows(decode, KSX1001DecodeError, bs, offsets)
+
+
+def truncate_to_bytes(cs: str, max_bytes: int) -> str:
+    return _records.truncate_to_bytes(encode, KSX1001EncodeError, cs, max_bytes)
+
+
+def encode_record(fields: Sequence[str], widths: Sequence[int], padding: bytes = b' ', truncate: bool = False) -> bytes:
+    return _records.encode_record(encode, KSX1001EncodeError, fields, widths, padding, truncate)
+
+
+def decode_record(bs: bytes | bytearray, widths: Sequence[int], padding: bytes = b' ') -> list[str]:
+    return _records.decode_record(decode, KSX1001DecodeError, bs, widths, padding)
+
+
+@_shared.cached_table
+def _get_packed_alphabet() -> str:
+    # 打包格式的码位空间：ASCII 字符和按编码排序的所有双字节字符
+    return _ASCII_CHARS + ''.join(c for _, c in iter_defined())
+
+
+@_shared.cached_table
+def _get_pack_table() -> str:
+    return _packed.build_pack_table(_get_packed_alphabet())
+
+
+def pack(cs: str) -> bytes:
+    """
+    打包为每个字符 14 位的紧凑格式
+    """
+    return _packed.pack(cs, _get_pack_table(), 'ksx1001', KSX1001EncodeError)
+
+
+def unpack(bs: bytes | bytearray) -> str:
+    return _packed.unpack(bs, _get_packed_alphabet(), KSX1001DecodeError)
+
+
+class IncrementalPacker(_packed.IncrementalPacker):
+    def __init__(self):
+        super().__init__(_get_pack_table(), 'ksx1001', KSX1001EncodeError)
+
+
+class IncrementalUnpacker(_packed.IncrementalUnpacker):
+    def __init__(self):
+        super().__init__(_get_packed_alphabet(), KSX1001DecodeError)
+
+
 def query_coord(c: str) -> tuple[int, int]:
     if len(c) != 1:
         raise KSX1001Exception('must be one character')
@@ -91,10 +277,11 @@ def query_coord(c: str) -> tuple[int, int]:
         bs = encode(c)
     except KSX1001EncodeError as e:
         raise KSX1001Exception(f"'\\u{ord(c):x}' is not a 'ksx1001' character") from e
+    # 使用 Hangul Filler 组合表示的音节不在字符集中
+    if len(bs) > 2:
+        raise KSX1001Exception(f"'\\u{ord(c):x}' is not a 'ksx1001' character")
     if len(bs) == 1:
         raise KSX1001Exception(f"'\\u{ord(c):x}' is a ascii character")
-    elif bs.startswith(b'\xa4\xd4') and len(bs) > 2:
-        raise KSX1001Exception(f"'\\u{ord(c):x}' is not a 'ksx1001' character")
     row = bs[0] - _EUC_OFFSET
     col = bs[1] - _EUC_OFFSET
     return row, col
@@ -109,6 +296,21 @@ def query_chr(row: int, col: int):
         raise KSX1001Exception(f"'ksx1001' coord at ({row}, {col}) is undefined'") from e
 
 
+@_shared.cached_table
+def _get_defined_bitmap() -> bytes:
+    # 标准库不能解码单独出现的 Hangul Filler
+    return _tables.build_defined_bitmap('ksx1001', [0xA4D4])
+
+
+def iter_defined(row_start: int = 1, row_end: int = 94) -> Iterator[tuple[tuple[int, int], str]]:
+    if row_start < 1 or row_end > 94:
+        raise KSX1001Exception(f"'row_start' and 'row_end' must between 1 and 94")
+    code_start = (row_start + _EUC_OFFSET) << 8
+    code_end = (row_end + _EUC_OFFSET) << 8 | 0xFF
+    for code, c in _tables.iter_defined(_get_defined_bitmap(), decode, code_start, code_end):
+        yield ((code >> 8) - _EUC_OFFSET, (code & 0xFF) - _EUC_OFFSET), c
+
+
 def get_categories() -> list[str]:
     return ['other', 'syllable', 'hanja']
 
@@ -128,38 +330,134 @@ def query_category(c: str) -> str | None:
         return None
 
 
-def _build_alphabet_by_rows_between(row_start: int, row_end: int) -> list[str]:
-    alphabet = []
-    for row in range(row_start, row_end + 1):
-        for col in range(1, 94 + 1):
-            try:
-                c = query_chr(row, col)
-                alphabet.append(c)
-            except KSX1001Exception:
-                pass
-    return alphabet
+def iter_runs(cs: str) -> Iterator[tuple[str | None, int, int]]:
+    category_ids = cs.translate(_get_category_table())
+    return _tables.iter_category_runs(category_ids, get_categories())
+
+
+def is_encodable(cs: str) -> bool:
+    return _tables.is_encodable(cs.translate(_get_category_table()))
+
+
+def find_unencodable(cs: str) -> list[tuple[int, str]]:
+    """
+    所有无法编码的字符及其位置
+    """
+    return _tables.find_unencodable(cs, cs.translate(_get_category_table()))
+
+
+def _is_inside_filler(bs: bytes | bytearray, start: int, end: int) -> bool:
+    # 匹配的两端不能落在 8 字节 Hangul Filler 序列的中间，否则匹配到的只是组合音节的一部分
+    for position in (start, end):
+        for sequence_start in (position - 2, position - 4, position - 6):
+            if sequence_start >= 0 and _FILLER_SEQUENCE_PATTERN.match(bs, sequence_start) is not None:
+                return True
+    return False
+
+
+def find(bs: bytes | bytearray, sub: str, start: int = 0, end: int | None = None) -> int:
+    """
+    在编码后的字节中查找 `sub`，返回字节位置，不存在时返回 -1
+    不解码整段字节，跳过不在字符边界上的匹配，`start` 需要位于字符边界
+    """
+    return next(finditer(bs, sub, start, end), -1)
+
+
+def finditer(bs: bytes | bytearray, sub: str, start: int = 0, end: int | None = None) -> Iterator[int]:
+    # 整段字节都已知，Hangul Filler 序列是否完整由之后的字节决定，交给 `_is_inside_filler` 检查
+    return _search.finditer(encode, _find_incomplete_character_start, bs, sub, start, end, _is_inside_filler)
+
+
+class CategoryCounter(_tables.CategoryCounter):
+    def __init__(self):
+        super().__init__('ksx1001', KSX1001Exception, get_categories(), _get_category_table(), IncrementalDecoder())
+
+
+def sort_key(cs: str) -> bytes:
+    return _tables.build_sort_key(cs, _get_sort_key_table(), encode, KSX1001EncodeError)
 
 
-_alphabet_other = _build_alphabet_by_rows_between(1, 12)
-_alphabet_syllable = _build_alphabet_by_rows_between(16, 40)
-_alphabet_hanja = _build_alphabet_by_rows_between(42, 93)
-_alphabet = _alphabet_other + _alphabet_syllable + _alphabet_hanja
+def sort_keys(css: Iterable[str]) -> list[bytes]:
+    return _tables.build_sort_keys(css, _get_sort_key_table(), encode, KSX1001EncodeError)
+
+
+def _build_alphabet_by_rows_between(row_start: int, row_end: int) -> str:
+    return ''.join(c for _, c in iter_defined(row_start, row_end))
+
+
+_alphabet_other = _shared.load(__name__, '_alphabet_other') or _build_alphabet_by_rows_between(1, 12)
+_alphabet_syllable = _shared.load(__name__, '_alphabet_syllable') or _build_alphabet_by_rows_between(16, 40)
+_alphabet_hanja = _shared.load(__name__, '_alphabet_hanja') or _build_alphabet_by_rows_between(42, 93)
+
+
+def _build_filler_syllables() -> str:
+    """
+    KS X 1001 只收录了 2350 个现代谚文音节，其余的 8822 个音节使用 Hangul Filler 加初声、中声、终声的组合表示，共 8 个字节
+    """
+    syllables = set(_alphabet_syllable)
+    return ''.join(chr(code_point) for code_point in range(0xAC00, 0xD7A3 + 1) if chr(code_point) not in syllables)
+
+
+@_shared.cached_table
+def _get_filler_jamo_indexes() -> tuple[bytes, bytes, bytes]:
+    """
+    Hangul Filler 组合序列的组合表：初声、中声、终声字母的第二个字节到音节中对应序号的转换，0xFF 表示不是对应的字母
+    """
+    syllables = _build_filler_syllables()
+    sequences = syllables.encode('ksx1001')
+    initial_indexes, medial_indexes, final_indexes = bytearray(b'\xff' * 256), bytearray(b'\xff' * 256), bytearray(b'\xff' * 256)
+    for c, initial, medial, final in zip(syllables, sequences[3::8], sequences[5::8], sequences[7::8]):
+        offset = ord(c) - 0xAC00
+        initial_indexes[initial] = offset // 588
+        medial_indexes[medial] = offset // 28 % 21
+        final_indexes[final] = offset % 28
+    return bytes(initial_indexes), bytes(medial_indexes), bytes(final_indexes)
+
+
+def _compose_filler_syllable(sequence: bytes | bytearray) -> str | None:
+    # 按初声、中声、终声的序号直接计算音节，8822 个音节只需要 3 个 256 字节的表
+    initial_indexes, medial_indexes, final_indexes = _get_filler_jamo_indexes()
+    initial = initial_indexes[sequence[3]]
+    medial = medial_indexes[sequence[5]]
+    final = final_indexes[sequence[7]]
+    if initial == 0xFF or medial == 0xFF or final == 0xFF:
+        return None
+    return chr(0xAC00 + (initial * 21 + medial) * 28 + final)
+
+
+@_shared.cached_table
+def _get_category_table() -> str:
+    return _tables.build_category_table([_alphabet_other, _alphabet_syllable, _alphabet_hanja], _ASCII_CHARS + _build_filler_syllables())
+
+
+@_shared.cached_table
+def _get_sort_key_table() -> str:
+    return _tables.build_sort_key_table(_get_category_table(), encode)
+
+
+@_shared.cached_table
+def _get_alphabet_index() -> _tables.AlphabetIndex:
+    return _tables.AlphabetIndex('ksx1001', KSX1001Exception, {
+        'other': _alphabet_other,
+        'syllable': _alphabet_syllable,
+        'hanja': _alphabet_hanja,
+    })
 
 
 def get_alphabet_other() -> list[str]:
-    return _alphabet_other.copy()
+    return list(_alphabet_other)
 
 
 def get_alphabet_syllable() -> list[str]:
-    return _alphabet_syllable.copy()
+    return list(_alphabet_syllable)
 
 
 def get_alphabet_hanja() -> list[str]:
-    return _alphabet_hanja.copy()
+    return list(_alphabet_hanja)
 
 
 def get_alphabet() -> list[str]:
-    return _alphabet.copy()
+    return list(_alphabet_other + _alphabet_syllable + _alphabet_hanja)
 
 
 def get_other_count() -> int:
@@ -175,4 +473,19 @@ def get_hanja_count() -> int:
 
 
 def get_count() -> int:
-    return len(_alphabet)
+    return len(_alphabet_other) + len(_alphabet_syllable) + len(_alphabet_hanja)
+
+
+def index_of(c: str, category: str | None = None) -> int:
+    return _get_alphabet_index().index_of(c, category)
+
+
+def char_at(index: int, category: str | None = None) -> str:
+    return _get_alphabet_index().char_at(index, category)
+
+
+def chars_in_unicode_range(start: int, end: int, category: str | None = None) -> list[str]:
+    """
+    字母表中码位在 `start` 与 `end` 之间（包含两端）的字符，按码位排序
+    """
+    return _get_alphabet_index().chars_in_unicode_range(start, end, category)
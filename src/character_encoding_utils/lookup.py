@@ -0,0 +1,80 @@
+import dataclasses
+from array import array
+from types import ModuleType
+
+from character_encoding_utils import _shared, _tables, big5, gb2312, ksx1001, shiftjis
+
+_MODULES: dict[str, ModuleType] = {
+    'gb2312': gb2312,
+    'big5': big5,
+    'shiftjis': shiftjis,
+    'ksx1001': ksx1001,
+}
+# 使用区位表示的编码
+_COORD_ENCODINGS = {'gb2312', 'ksx1001'}
+_EUC_OFFSET = 0xA0
+
+
+class LookupException(Exception):
+    pass
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class Entry:
+    encoding: str
+    # 编码后的字节按大端序组成的整数，例如 GB2312 的 '啊' 为 0xB0A1
+    code: int
+    # 区位，只有 GB2312 和 KS X 1001 的双字节字符有
+    coord: tuple[int, int] | None
+    category: str
+
+
+@_shared.cached_table
+def _get_code_tables() -> dict[str, array]:
+    # 以码位为下标的编码表，字符是否在字符集中由类别表判断
+    tables = {}
+    for encoding, module in _MODULES.items():
+        table = array('H', bytes(2 * _tables.CATEGORY_TABLE_SIZE))
+        for c in module.get_alphabet():
+            table[ord(c)] = int.from_bytes(module.encode(c), 'big')
+        tables[encoding] = table
+    return tables
+
+
+def _get_entry(encoding: str, code_point: int) -> Entry | None:
+    if code_point >= _tables.CATEGORY_TABLE_SIZE:
+        return None
+    module = _MODULES[encoding]
+    categories = module.get_categories()
+    category_id = ord(module._get_category_table()[code_point])
+    if category_id >= len(categories):
+        return None
+    code = _get_code_tables()[encoding][code_point]
+    if encoding in _COORD_ENCODINGS and code > 0xFF:
+        coord = (code >> 8) - _EUC_OFFSET, (code & 0xFF) - _EUC_OFFSET
+    else:
+        coord = None
+    return Entry(encoding, code, coord, categories[category_id])
+
+
+def _lookup_code_point(code_point: int) -> dict[str, Entry]:
+    entries = {}
+    for encoding in _MODULES:
+        entry = _get_entry(encoding, code_point)
+        if entry is not None:
+            entries[encoding] = entry
+    return entries
+
+
+def get_encodings() -> list[str]:
+    return list(_MODULES)
+
+
+def lookup(c: str) -> dict[str, Entry]:
+    if len(c) != 1:
+        raise LookupException('must be one character')
+    return _lookup_code_point(ord(c))
+
+
+def lookup_all(cs: str) -> list[dict[str, Entry]]:
+    return [_lookup_code_point(ord(c)) for c in cs]
@@ -0,0 +1,109 @@
+import importlib
+import os
+import sys
+from array import array
+from multiprocessing import shared_memory
+from types import ModuleType
+
+from character_encoding_utils import _shared
+
+# 延迟导入，以便在构建字母表之前附加共享内存
+_MODULE_NAMES = ['gb2312', 'big5', 'shiftjis', 'ksx1001', 'lookup']
+_TABLE_TYPES = (str, bytes, tuple, list, dict, set, frozenset, array)
+
+
+def _get_deep_size(obj: object, seen: set[int]) -> int:
+    if id(obj) in seen or isinstance(obj, (ModuleType, type)):
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(_get_deep_size(key, seen) + _get_deep_size(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (tuple, list, set, frozenset)):
+        size += sum(_get_deep_size(item, seen) for item in obj)
+    elif hasattr(obj, '__dict__'):
+        size += _get_deep_size(vars(obj), seen)
+    elif hasattr(obj, '__slots__'):
+        size += sum(_get_deep_size(getattr(obj, name), seen) for name in obj.__slots__ if hasattr(obj, name))
+    return size
+
+
+def _get_modules() -> dict[str, ModuleType]:
+    return {name: importlib.import_module(f'character_encoding_utils.{name}') for name in _MODULE_NAMES}
+
+
+def _is_table_getter(name: str, value: object) -> bool:
+    return name.startswith('_get_') and hasattr(value, 'cache_info')
+
+
+def _get_module_usage(module: ModuleType) -> dict[str, int]:
+    usage = {}
+    seen = set()
+    for name, value in vars(module).items():
+        if not name.startswith('_') or name.startswith('__'):
+            continue
+        if isinstance(value, _TABLE_TYPES):
+            usage[name] = _get_deep_size(value, seen)
+        elif _is_table_getter(name, value) and value.cache_info().currsize > 0:
+            # 只统计已经构建的延迟表，不触发构建
+            usage[name] = _get_deep_size(value(), seen)
+    return usage
+
+
+def get_memory_usage() -> dict[str, dict[str, int]]:
+    """
+    各模块常驻表占用的字节数，按模块和表名分组
+    """
+    return {name: _get_module_usage(module) for name, module in _get_modules().items()}
+
+
+def get_total_memory_usage() -> int:
+    return sum(sum(usage.values()) for usage in get_memory_usage().values())
+
+
+def preload():
+    """
+    构建所有延迟表，在 fork 之前调用可以让子进程共享父进程中已经构建的表
+    """
+    for module in _get_modules().values():
+        for name, value in vars(module).items():
+            if _is_table_getter(name, value):
+                value()
+
+
+def publish_tables() -> shared_memory.SharedMemory:
+    """
+    将所有表发布到共享内存，之后启动的子进程在导入时直接加载而不是重新构建
+    调用者需要持有返回的共享内存，并在所有子进程退出后调用 `release_tables()`
+    """
+    preload()
+    tables = {}
+    for module in _get_modules().values():
+        for name, value in vars(module).items():
+            if name.startswith('_alphabet_') and isinstance(value, str):
+                tables[f'{module.__name__}.{name}'] = value
+            elif _is_table_getter(name, value):
+                tables[f'{module.__name__}.{name}'] = value()
+    block = _shared.dump(tables)
+    os.environ[_shared.ENVIRON_KEY] = block.name
+    return block
+
+
+def release_tables(block: shared_memory.SharedMemory):
+    """
+    释放 `publish_tables()` 发布的共享内存，并清除环境变量，之后启动的子进程不再尝试附加
+    """
+    if os.environ.get(_shared.ENVIRON_KEY) == block.name:
+        del os.environ[_shared.ENVIRON_KEY]
+    _shared.attach.cache_clear()
+    block.close()
+    block.unlink()
+
+
+def attach_tables(name: str) -> bool:
+    """
+    附加到其他进程发布的共享内存，需要在导入编码模块之前调用
+    """
+    os.environ[_shared.ENVIRON_KEY] = name
+    _shared.attach.cache_clear()
+    return _shared.attach() is not None
@@ -1,4 +1,22 @@
-import itertools
+import re
+from collections.abc import AsyncIterator, Iterable, Iterator, Sequence
+from typing import TYPE_CHECKING
+
+from character_encoding_utils import _cache, _columnar, _packed, _records, _search, _shared, _tables
+from character_encoding_utils._concurrent import map_in_threads
+
+if TYPE_CHECKING:
+    import asyncio
+
+_HIGH_BYTES = bytes(range(0x80, 0x100))
+_REPLACED_CHARS_PATTERN = re.compile(r'[\\~]')
+_REPLACED_CHARS = {
+    '\\': '¥',
+    '~': '‾',
+}
+_COMPLETE_HIGH_BYTES_PATTERN = re.compile(rb'(?:[\xa1-\xdf]|[\x80-\xa0\xe0-\xff][\x00-\xff])*')
+# 经过区点转换表后，不是双字节字符的位置：0 表示未定义，基本多文种平面以外的字符保持原样
+_UNDEFINED_COORD_PATTERN = re.compile('[\x00\U00010000-\U0010ffff]')
 
 
 class ShiftJISException(Exception):
@@ -37,22 +55,20 @@ class ShiftJISDecodeError(ShiftJISException):
 
 
 def encode(cs: str) -> bytes:
-    bs = bytearray()
-    for position, c in enumerate(cs):
-        match c:
-            case '\\':
-                raise ShiftJISEncodeError(c, position, f"in 'shift-jis' the character '\\' is replaced with '¥'")
-            case '~':
-                raise ShiftJISEncodeError(c, position, f"in 'shift-jis' the character '~' is replaced with '‾'")
-            case _:
-                try:
-                    bs.extend(c.encode('shift-jis'))
-                except UnicodeEncodeError as e:
-                    raise ShiftJISEncodeError(c, position, e.reason) from e
-    return bytes(bs)
+    # '\\' 和 '~' 在 Shift-JIS 中被替换为 '¥' 和 '‾'，标准库会把它们编码成相同的字节，因此需要先找出来
+    match = _REPLACED_CHARS_PATTERN.search(cs)
+    end = len(cs) if match is None else match.start()
+    try:
+        bs = cs[:end].encode('shift-jis')
+    except UnicodeEncodeError as e:
+        raise ShiftJISEncodeError(cs[e.start], e.start, e.reason) from e
+    if match is not None:
+        c = match.group()
+        raise ShiftJISEncodeError(c, end, f"in 'shift-jis' the character '{c}' is replaced with '{_REPLACED_CHARS[c]}'")
+    return bs
 
 
-def decode(bs: bytes | bytearray) -> str:
+def _decode_by_characters(bs: bytes | bytearray) -> str:
     cs = []
     cursor = 0
     passed = 0
@@ -81,6 +97,202 @@ def decode(bs: bytes | bytearray) -> str:
     return ''.join(cs)
 
 
+def decode(bs: bytes | bytearray) -> str:
+    try:
+        cs = bs.decode('shift-jis')
+    except UnicodeDecodeError:
+        # 逐个字符重新解码，以得到准确的错误位置
+        return _decode_by_characters(bs)
+    # 整段替换，没有出现时 str.replace 直接返回原字符串
+    return cs.replace('\\', '¥').replace('~', '‾')
+
+
+def _find_incomplete_start(bs: bytes) -> int:
+    # 小于等于 0x7F 的字节之后一定是字符边界，末尾连续高位字节需要重新切分
+    high_start = len(bs.rstrip(_HIGH_BYTES))
+    return _COMPLETE_HIGH_BYTES_PATTERN.match(bs, high_start).end()
+
+
+class IncrementalDecoder:
+    pending: bytes
+    passed: int
+
+    def __init__(self):
+        self.pending = b''
+        self.passed = 0
+
+    def decode(self, bs: bytes | bytearray, final: bool = False) -> str:
+        bs = self.pending + bs
+        end = len(bs) if final else _find_incomplete_start(bs)
+        try:
+            cs = decode(bs[:end])
+        except ShiftJISDecodeError as e:
+            e.position += self.passed
+            raise
+        self.pending = bs[end:]
+        self.passed += end
+        return cs
+
+    def reset(self):
+        self.pending = b''
+        self.passed = 0
+
+
+class CodecCache(_cache.CodecCache):
+    def __init__(self, maxsize: int | None = 4096, max_length: int = 256):
+        super().__init__(encode, decode, maxsize, max_length)
+
+
+async def decode_stream(reader: 'asyncio.StreamReader', chunk_size: int = 8192) -> AsyncIterator[str]:
+    decoder = IncrementalDecoder()
+    while True:
+        bs = await reader.read(chunk_size)
+        cs = decoder.decode(bs, final=not bs)
+        if cs:
+            yield cs
+        if not bs:
+            break
+
+
+async def encode_stream(writer: 'asyncio.StreamWriter', cs: str):
+    writer.write(encode(cs))
+    await writer.drain()
+
+
+def encode_many(css: Iterable[str], workers: int | None = None) -> list[bytes]:
+    return map_in_threads(encode, css, workers)
+
+
+def decode_many(bss: Iterable[bytes | bytearray], workers: int | None = None) -> list[str]:
+    return map_in_threads(decode, bss, workers)
+
+
+def encode_columnar(css: Iterable[str]) -> tuple[bytes, list[int], list[ShiftJISEncodeError | None]]:
+    return _columnar.encode_rows(encode, ShiftJISEncodeError, css)
+
+
+def decode_columnar(bs: bytes | bytearray, offsets: Sequence[int]) -> tuple[list[str | None], list[ShiftJISDecodeError | None]]:
+    return _columnar.decode_rows(decode, ShiftJISDecodeError, bs, offsets)
+
+
+def truncate_to_bytes(cs: str, max_bytes: int) -> str:
+    return _records.truncate_to_bytes(encode, ShiftJISEncodeError, cs, max_bytes)
+
+
+def encode_record(fields: Sequence[str], widths: Sequence[int], padding: bytes = b' ', truncate: bool = False) -> bytes:
+    return _records.encode_record(encode, ShiftJISEncodeError, fields, widths, padding, truncate)
+
+
+def decode_record(bs: bytes | bytearray, widths: Sequence[int], padding: bytes = b' ') -> list[str]:
+    return _records.decode_record(decode, ShiftJISDecodeError, bs, widths, padding)
+
+
+@_shared.cached_table
+def _get_packed_alphabet() -> str:
+    # 打包格式的码位空间：按编码排序的所有单字节和双字节字符
+    return ''.join(c for _, c in iter_defined())
+
+
+@_shared.cached_table
+def _get_pack_table() -> str:
+    return _packed.build_pack_table(_get_packed_alphabet())
+
+
+def pack(cs: str) -> bytes:
+    """
+    打包为每个字符 14 位的紧凑格式
+    """
+    return _packed.pack(cs, _get_pack_table(), 'shift-jis', ShiftJISEncodeError)
+
+
+def unpack(bs: bytes | bytearray) -> str:
+    return _packed.unpack(bs, _get_packed_alphabet(), ShiftJISDecodeError)
+
+
+class IncrementalPacker(_packed.IncrementalPacker):
+    def __init__(self):
+        super().__init__(_get_pack_table(), 'shift-jis', ShiftJISEncodeError)
+
+
+class IncrementalUnpacker(_packed.IncrementalUnpacker):
+    def __init__(self):
+        super().__init__(_get_packed_alphabet(), ShiftJISDecodeError)
+
+
+def _code_to_coord(code: int) -> tuple[int, int]:
+    # JIS X 0208 每两个区共用一个第一位字节，奇数区的第二位字节为 0x40 ~ 0x9E（跳过 0x7F），偶数区为 0x9F ~ 0xFC
+    first_byte = code >> 8
+    second_byte = code & 0xFF
+    row = (first_byte - (0x81 if first_byte <= 0x9F else 0xC1)) * 2 + 1
+    if second_byte >= 0x9F:
+        return row + 1, second_byte - 0x9E
+    return row, second_byte - (0x3F if second_byte <= 0x7E else 0x40)
+
+
+@_shared.cached_table
+def _get_coord_table() -> str:
+    """
+    码位到 `区 << 8 | 点` 的转换表，用于 `str.translate`，0 表示不是双字节字符
+    """
+    table = ['\x00'] * _tables.CATEGORY_TABLE_SIZE
+    for code, c in iter_defined(0x8140, 0xFFFF):
+        row, col = _code_to_coord(code)
+        table[ord(c)] = chr(row << 8 | col)
+    return ''.join(table)
+
+
+@_shared.cached_table
+def _get_coord_chr_table() -> str:
+    """
+    按 `(区 - 1) * 94 + (点 - 1)` 排列的字符，'\\x00' 表示未定义
+    """
+    table = ['\x00'] * (94 * 94)
+    for code, c in iter_defined(0x8140, 0xFFFF):
+        row, col = _code_to_coord(code)
+        table[(row - 1) * 94 + col - 1] = c
+    return ''.join(table)
+
+
+def query_coord(c: str) -> tuple[int, int]:
+    if len(c) != 1:
+        raise ShiftJISException('must be one character')
+    code_point = ord(c)
+    coord = ord(_get_coord_table()[code_point]) if code_point < _tables.CATEGORY_TABLE_SIZE else 0
+    if coord == 0:
+        raise ShiftJISException(f"'\\u{code_point:x}' is not a 'shift-jis' double-byte character")
+    return coord >> 8, coord & 0xFF
+
+
+def query_coords(cs: str) -> list[tuple[int, int]]:
+    coords = cs.translate(_get_coord_table())
+    match = _UNDEFINED_COORD_PATTERN.search(coords)
+    if match is not None:
+        raise ShiftJISException(f"'\\u{ord(cs[match.start()]):x}' at position {match.start()} is not a 'shift-jis' double-byte character")
+    return [divmod(coord, 0x100) for coord in map(ord, coords)]
+
+
+def query_chr(row: int, col: int) -> str:
+    if row < 1 or row > 94 or col < 1 or col > 94:
+        raise ShiftJISException(f"'row' and 'col' must between 1 and 94")
+    c = _get_coord_chr_table()[(row - 1) * 94 + col - 1]
+    if c == '\x00':
+        raise ShiftJISException(f"'shift-jis' coord at ({row}, {col}) is undefined")
+    return c
+
+
+def query_chrs(coords: Iterable[tuple[int, int]]) -> list[str]:
+    return [query_chr(row, col) for row, col in coords]
+
+
+@_shared.cached_table
+def _get_defined_bitmap() -> bytes:
+    return _tables.build_defined_bitmap('shift-jis')
+
+
+def iter_defined(code_start: int = 0x0000, code_end: int = 0xFFFF) -> Iterator[tuple[int, str]]:
+    return _tables.iter_defined(_get_defined_bitmap(), decode, code_start, code_end)
+
+
 def get_categories() -> list[str]:
     return [
         'single-byte-ascii-control',
@@ -116,93 +328,111 @@ def query_category(c: str) -> str | None:
             return None
 
 
-def _build_alphabet_single_byte(byte_start: int, byte_end: int) -> list[str]:
-    alphabet = []
-    for code in range(byte_start, byte_end + 1):
-        try:
-            c = decode(bytes([code]))
-            alphabet.append(c)
-        except ShiftJISDecodeError:
-            pass
-    return alphabet
+def iter_runs(cs: str) -> Iterator[tuple[str | None, int, int]]:
+    category_ids = cs.translate(_get_category_table())
+    return _tables.iter_category_runs(category_ids, get_categories())
+
 
+def is_encodable(cs: str) -> bool:
+    return _tables.is_encodable(cs.translate(_get_category_table()))
 
-def _build_alphabet_double_byte_other() -> list[str]:
+
+def find_unencodable(cs: str) -> list[tuple[int, str]]:
     """
-    第一位字节使用 0x81 ~ 0x87，第二位字节使用 0x40 ~ 0x7E、0x80 ~ 0xFC
-    第一位字节使用 0x88，第二位字节使用 0x40 ~ 0x7E、0x80 ~ 0x9E
+    所有无法编码的字符及其位置
     """
-    alphabet = []
-    for first_byte in range(0x81, 0x88 + 1):
-        for second_byte in range(0x40, 0x7E + 1):
-            try:
-                c = decode(bytes([first_byte, second_byte]))
-                alphabet.append(c)
-            except ShiftJISDecodeError:
-                pass
-        for second_byte in range(0x80, (0x9E if first_byte == 0x88 else 0xFC) + 1):
-            try:
-                c = decode(bytes([first_byte, second_byte]))
-                alphabet.append(c)
-            except ShiftJISDecodeError:
-                pass
-    return alphabet
-
-
-def _build_alphabet_double_byte_kanji() -> list[str]:
+    return _tables.find_unencodable(cs, cs.translate(_get_category_table()))
+
+
+def find(bs: bytes | bytearray, sub: str, start: int = 0, end: int | None = None) -> int:
     """
-    第一位字节使用 0x88，第二位字节使用 0x9F ~ 0xFC
-    第一位字节使用 0x89 ~ 0x9F、0xE0 ~ 0xEF，第二位字节使用 0x40 ~ 0x7E、0x80 ~ 0xFC
+    在编码后的字节中查找 `sub`，返回字节位置，不存在时返回 -1
+    不解码整段字节，跳过不在字符边界上的匹配，`start` 需要位于字符边界
     """
-    alphabet = []
-    for first_byte in itertools.chain(range(0x88, 0x9F + 1), range(0xE0, 0xEF + 1)):
-        if first_byte >= 0x89:
-            for second_byte in range(0x40, 0x7E + 1):
-                try:
-                    c = decode(bytes([first_byte, second_byte]))
-                    alphabet.append(c)
-                except ShiftJISDecodeError:
-                    pass
-        for second_byte in range(0x9F if first_byte == 0x88 else 0x80, 0xFC + 1):
-            try:
-                c = decode(bytes([first_byte, second_byte]))
-                alphabet.append(c)
-            except ShiftJISDecodeError:
-                pass
-    return alphabet
-
-
-_alphabet_single_byte_ascii_control = _build_alphabet_single_byte(0x00, 0x1F)
-_alphabet_single_byte_ascii_control.append(chr(0x7F))
-_alphabet_single_byte_ascii_printable = _build_alphabet_single_byte(0x20, 0x7E)
-_alphabet_single_byte_half_width_katakana = _build_alphabet_single_byte(0xA1, 0xDF)
-_alphabet_double_byte_other = _build_alphabet_double_byte_other()
-_alphabet_double_byte_kanji = _build_alphabet_double_byte_kanji()
-_alphabet = _alphabet_single_byte_ascii_control + _alphabet_single_byte_ascii_printable + _alphabet_single_byte_half_width_katakana + _alphabet_double_byte_other + _alphabet_double_byte_kanji
+    return next(finditer(bs, sub, start, end), -1)
+
+
+def finditer(bs: bytes | bytearray, sub: str, start: int = 0, end: int | None = None) -> Iterator[int]:
+    return _search.finditer(encode, _find_incomplete_start, bs, sub, start, end)
+
+
+class CategoryCounter(_tables.CategoryCounter):
+    def __init__(self):
+        super().__init__('shift-jis', ShiftJISException, get_categories(), _get_category_table(), IncrementalDecoder())
+
+
+def sort_key(cs: str) -> bytes:
+    return _tables.build_sort_key(cs, _get_sort_key_table(), encode, ShiftJISEncodeError)
+
+
+def sort_keys(css: Iterable[str]) -> list[bytes]:
+    return _tables.build_sort_keys(css, _get_sort_key_table(), encode, ShiftJISEncodeError)
+
+
+def _build_alphabet_by_codes_between(code_start: int, code_end: int) -> str:
+    return ''.join(c for _, c in iter_defined(code_start, code_end))
+
+
+_alphabet_single_byte_ascii_control = _shared.load(__name__, '_alphabet_single_byte_ascii_control') or _build_alphabet_by_codes_between(0x00, 0x1F) + chr(0x7F)
+_alphabet_single_byte_ascii_printable = _shared.load(__name__, '_alphabet_single_byte_ascii_printable') or _build_alphabet_by_codes_between(0x20, 0x7E)
+_alphabet_single_byte_half_width_katakana = _shared.load(__name__, '_alphabet_single_byte_half_width_katakana') or _build_alphabet_by_codes_between(0xA1, 0xDF)
+# 第一位字节使用 0x81 ~ 0x87，第二位字节使用 0x40 ~ 0x7E、0x80 ~ 0xFC
+# 第一位字节使用 0x88，第二位字节使用 0x40 ~ 0x7E、0x80 ~ 0x9E
+_alphabet_double_byte_other = _shared.load(__name__, '_alphabet_double_byte_other') or _build_alphabet_by_codes_between(0x8140, 0x889E)
+# 第一位字节使用 0x88，第二位字节使用 0x9F ~ 0xFC
+# 第一位字节使用 0x89 ~ 0x9F、0xE0 ~ 0xEF，第二位字节使用 0x40 ~ 0x7E、0x80 ~ 0xFC
+_alphabet_double_byte_kanji = _shared.load(__name__, '_alphabet_double_byte_kanji') or _build_alphabet_by_codes_between(0x889F, 0xEFFC)
+
+
+@_shared.cached_table
+def _get_category_table() -> str:
+    return _tables.build_category_table([
+        _alphabet_single_byte_ascii_control,
+        _alphabet_single_byte_ascii_printable,
+        _alphabet_single_byte_half_width_katakana,
+        _alphabet_double_byte_other,
+        _alphabet_double_byte_kanji,
+    ], '')
+
+
+@_shared.cached_table
+def _get_sort_key_table() -> str:
+    return _tables.build_sort_key_table(_get_category_table(), encode)
+
+
+@_shared.cached_table
+def _get_alphabet_index() -> _tables.AlphabetIndex:
+    return _tables.AlphabetIndex('shift-jis', ShiftJISException, {
+        'single-byte-ascii-control': _alphabet_single_byte_ascii_control,
+        'single-byte-ascii-printable': _alphabet_single_byte_ascii_printable,
+        'single-byte-half-width-katakana': _alphabet_single_byte_half_width_katakana,
+        'double-byte-other': _alphabet_double_byte_other,
+        'double-byte-kanji': _alphabet_double_byte_kanji,
+    })
 
 
 def get_alphabet_single_byte_ascii_control() -> list[str]:
-    return _alphabet_single_byte_ascii_control.copy()
+    return list(_alphabet_single_byte_ascii_control)
 
 
 def get_alphabet_single_byte_ascii_printable() -> list[str]:
-    return _alphabet_single_byte_ascii_printable.copy()
+    return list(_alphabet_single_byte_ascii_printable)
 
 
 def get_alphabet_single_byte_half_width_katakana() -> list[str]:
-    return _alphabet_single_byte_half_width_katakana.copy()
+    return list(_alphabet_single_byte_half_width_katakana)
 
 
 def get_alphabet_double_byte_other() -> list[str]:
-    return _alphabet_double_byte_other.copy()
+    return list(_alphabet_double_byte_other)
 
 
 def get_alphabet_double_byte_kanji() -> list[str]:
-    return _alphabet_double_byte_kanji.copy()
+    return list(_alphabet_double_byte_kanji)
 
 
 def get_alphabet() -> list[str]:
-    return _alphabet.copy()
+    return list(_alphabet_single_byte_ascii_control + _alphabet_single_byte_ascii_printable + _alphabet_single_byte_half_width_katakana + _alphabet_double_byte_other + _alphabet_double_byte_kanji)
 
 
 def get_single_byte_ascii_control_count() -> int:
@@ -226,4 +456,19 @@ def get_double_byte_kanji_count() -> int:
 
 
 def get_count() -> int:
-    return len(_alphabet)
+    return len(_alphabet_single_byte_ascii_control) + len(_alphabet_single_byte_ascii_printable) + len(_alphabet_single_byte_half_width_katakana) + len(_alphabet_double_byte_other) + len(_alphabet_double_byte_kanji)
+
+
+def index_of(c: str, category: str | None = None) -> int:
+    return _get_alphabet_index().index_of(c, category)
+
+
+def char_at(index: int, category: str | None = None) -> str:
+    return _get_alphabet_index().char_at(index, category)
+
+
+def chars_in_unicode_range(start: int, end: int, category: str | None = None) -> list[str]:
+    """
+    字母表中码位在 `start` 与 `end` 之间（包含两端）的字符，按码位排序
+    """
+    return _get_alphabet_index().chars_in_unicode_range(start, end, category)
@@ -1,3 +1,5 @@
+import asyncio
+
 import pytest
 
 from character_encoding_utils import big5
@@ -61,6 +63,124 @@ def test_codec():
     assert ord(c) == 0xFE68
     assert big5.decode(big5.encode(c)) == c
 
+    cs = 'abc〸十中〹∕國／＼〺﹨'
+    assert big5.decode(big5.encode(cs)) == cs
+
+    with pytest.raises(Big5EncodeError) as info:
+        big5.encode('〸가卄')
+    assert info.value.obj == '가'
+    assert info.value.position == 1
+
+    with pytest.raises(Big5EncodeError) as info:
+        big5.encode('〸卄가')
+    assert info.value.obj == '卄'
+    assert info.value.position == 1
+
+    # 不在字符边界上的 0xA241 不是 '∕'
+    assert big5.decode(b'\xa4\xa2\x41') == b'\xa4\xa2'.decode('big5') + 'A'
+    assert big5.decode(b'\xa2\xcc\xa4\xa2\x41\xa2\x41') == '〸' + b'\xa4\xa2'.decode('big5') + 'A∕'
+
+    # 包含映射差异的长文本需要在线性时间内解码
+    cs = '〸' + '中文字' * 100000 + '∕a'
+    bs = big5.encode(cs)
+    assert big5.decode(bs) == cs
+
+
+def test_incremental_decoder():
+    bs = b'abc\xa4\xa4\xb0\xea'
+    for size in range(1, len(bs) + 1):
+        decoder = big5.IncrementalDecoder()
+        cs = ''.join(decoder.decode(bs[i:i + size]) for i in range(0, len(bs), size))
+        cs += decoder.decode(b'', final=True)
+        assert cs == 'abc中國'
+
+    decoder = big5.IncrementalDecoder()
+    assert decoder.decode(b'abc') == 'abc'
+    with pytest.raises(Big5DecodeError) as info:
+        decoder.decode(b'\xa4\xa4\xb0', final=True)
+    assert info.value.position == 5
+
+
+def test_codec_cache():
+    cache = big5.CodecCache(maxsize=2, max_length=8)
+    bs = big5.encode('abc中國')
+    for _ in range(3):
+        assert cache.encode('abc中國') == bs
+        assert cache.decode(bytearray(bs)) == 'abc中國'
+    assert cache.cache_info()['encode'].hits == 2
+    assert cache.cache_info()['decode'] == (2, 1, 2, 1)
+    assert cache.decode(bs * 2) == 'abc中國' * 2
+    assert cache.cache_info()['decode'].currsize == 1
+
+    with pytest.raises(Big5DecodeError):
+        cache.decode(b'\xa4\xa4\xa4')
+    cache.cache_clear()
+    assert cache.cache_info()['encode'] == (0, 0, 2, 0)
+
+
+def test_stream():
+    class StreamWriter:
+        def __init__(self):
+            self.buffer = bytearray()
+            self.drain_count = 0
+
+        def write(self, bs: bytes):
+            self.buffer.extend(bs)
+
+        async def drain(self):
+            self.drain_count += 1
+
+    async def run():
+        reader = asyncio.StreamReader()
+        reader.feed_data(b'abc\xa4\xa4\xb0\xea')
+        reader.feed_eof()
+        cs = ''.join([chunk async for chunk in big5.decode_stream(reader, chunk_size=3)])
+
+        writer = StreamWriter()
+        await big5.encode_stream(writer, cs)
+        return cs, writer
+
+    cs, writer = asyncio.run(run())
+    assert cs == 'abc中國'
+    assert writer.buffer == b'abc\xa4\xa4\xb0\xea'
+    assert writer.drain_count == 1
+
+
+def test_many():
+    css = ['abc中國', 'abc', ''] * 50
+    bss = [b'abc\xa4\xa4\xb0\xea', b'abc', b''] * 50
+    for workers in [None, 1, 4]:
+        assert big5.encode_many(css, workers=workers) == bss
+        assert big5.decode_many(bss, workers=workers) == css
+
+    with pytest.raises(Big5EncodeError):
+        big5.encode_many(['abc中國', 'abc가'], workers=2)
+    with pytest.raises(Big5DecodeError):
+        big5.decode_many([b'abc\xa4\xa4\xb0\xea', b'abc\xa4\xa4\xb0'], workers=2)
+
+
+def test_columnar():
+    bs, offsets, errors = big5.encode_columnar(['abc中國', '', 'abc가', 'd'])
+    assert bs == b'abc\xa4\xa4\xb0\xea' + b'd'
+    assert offsets == [0, len(b'abc\xa4\xa4\xb0\xea'), len(b'abc\xa4\xa4\xb0\xea'), len(b'abc\xa4\xa4\xb0\xea'), len(b'abc\xa4\xa4\xb0\xea') + 1]
+    assert errors[0] is None
+    assert errors[1] is None
+    assert isinstance(errors[2], Big5EncodeError)
+    assert errors[2].position == 3
+    assert errors[3] is None
+
+    bs = b'abc\xa4\xa4\xb0\xea' + b'\xa4\xa4\xb0' + b'd'
+    offsets = [0, len(b'abc\xa4\xa4\xb0\xea'), len(b'abc\xa4\xa4\xb0\xea') + len(b'\xa4\xa4\xb0'), len(bs)]
+    css, errors = big5.decode_columnar(bs, offsets)
+    assert css == ['abc中國', None, 'd']
+    assert errors[0] is None
+    assert isinstance(errors[1], Big5DecodeError)
+    assert errors[1].position == 2
+    assert errors[2] is None
+
+    with pytest.raises(ValueError):
+        big5.decode_columnar(bs, [0, len(bs) + 1])
+
 
 def test_query_code():
     assert big5.query_code('　') == 0xA140
@@ -110,6 +230,62 @@ def test_query_category():
     assert big5.query_category('가') is None
 
 
+def test_iter_runs():
+    assert list(big5.iter_runs('abc中國乂■卄😈d')) == [
+        (None, 0, 3),
+        ('level-1', 3, 5),
+        ('level-2', 5, 6),
+        ('other', 6, 7),
+        ('unencodable', 7, 9),
+        (None, 9, 10),
+    ]
+    assert list(big5.iter_runs('')) == []
+
+
+def test_is_encodable():
+    assert big5.is_encodable('abc中國')
+    assert big5.is_encodable('')
+    assert not big5.is_encodable('中国😈a')
+    assert big5.find_unencodable('abc中國') == []
+    assert big5.find_unencodable('中国😈a') == [(1, '国'), (2, '😈')]
+
+
+def test_find():
+    bs = big5.encode('功能A')
+    assert list(big5.finditer(bs, 'A')) == [4]
+    assert big5.find(bs, 'A') == 4
+    assert big5.find(bs, 'A', 0, 4) == -1
+    assert big5.find(big5.encode('功能'), '\\') == -1
+
+    # 与解码后查找的结果比较，覆盖跨过较长的双字节字符序列的情况
+    alphabet = big5.get_alphabet()
+    cs = ''.join(alphabet[(index * 7919) % len(alphabet)] for index in range(2000)) + '\n' + ''.join(alphabet[:1000])
+    bs = big5.encode(cs)
+    for sub in {cs[1500:1501], cs[1900:1902], alphabet[500], alphabet[-1]}:
+        expected = []
+        index = cs.find(sub)
+        while index != -1:
+            expected.append(len(big5.encode(cs[:index])))
+            index = cs.find(sub, index + len(sub))
+        assert list(big5.finditer(bs, sub)) == expected
+
+    with pytest.raises(Big5EncodeError):
+        big5.find(bs, '国')
+    with pytest.raises(ValueError):
+        big5.find(bs, '')
+
+
+def test_sort_key():
+    # 常用字按笔画排序
+    css = ['中', '一', 'abc', '乂', '丁', '中a', '😈', '卄', '']
+    assert sorted(css, key=big5.sort_key) == ['', 'abc', '一', '丁', '中', '中a', '乂', '卄', '😈']
+    assert big5.sort_key('a中') == b'\x00a\xa4\xa4'
+    assert big5.sort_key('〸') == b'\xa2\xcc'
+    assert big5.sort_keys(css) == [big5.sort_key(cs) for cs in css]
+    assert big5.sort_keys(['a中', '國']) == [b'\x00a\xa4\xa4', b'\xb0\xea']
+    assert big5.sort_keys([]) == []
+
+
 def test_alphabet():
     alphabet = big5.get_alphabet_other()
     assert len(alphabet) == 408
@@ -147,6 +323,115 @@ def test_count():
     assert big5.get_count() == 13461
 
 
+def test_index():
+    alphabet = big5.get_alphabet()
+    for index, c in enumerate(alphabet):
+        assert big5.index_of(c) == index
+        assert big5.char_at(index) == c
+
+    assert big5.index_of('一', 'level-1') == 0
+    assert big5.char_at(0, 'level-1') == '一'
+    assert big5.index_of('一') == big5.get_other_count()
+
+    with pytest.raises(Big5Exception):
+        big5.index_of('가')
+    with pytest.raises(Big5Exception):
+        big5.index_of('一', 'other')
+    with pytest.raises(Big5Exception):
+        big5.index_of('一', 'unknown')
+    with pytest.raises(Big5Exception):
+        big5.index_of('😈')
+    with pytest.raises(Big5Exception):
+        big5.index_of('abc')
+    with pytest.raises(Big5Exception):
+        big5.char_at(-1)
+    with pytest.raises(Big5Exception):
+        big5.char_at(len(alphabet))
+
+
+def test_chars_in_unicode_range():
+    alphabet = big5.get_alphabet()
+    chars = big5.chars_in_unicode_range(0x4E00, 0x9FFF)
+    assert chars[:2] == ['一', '丁']
+    assert chars == sorted(c for c in alphabet if 0x4E00 <= ord(c) <= 0x9FFF)
+    assert big5.chars_in_unicode_range(0x4E00, 0x9FFF, 'level-1') == sorted(c for c in chars if big5.query_category(c) == 'level-1')
+    assert big5.chars_in_unicode_range(0, 0x10FFFF) == sorted(alphabet)
+    assert big5.chars_in_unicode_range(0x1F600, 0x1F64F) == []
+
+    with pytest.raises(Big5Exception):
+        big5.chars_in_unicode_range(0x9FFF, 0x4E00)
+    with pytest.raises(Big5Exception):
+        big5.chars_in_unicode_range(0, 0x110000)
+    with pytest.raises(Big5Exception):
+        big5.chars_in_unicode_range(0, 0xFFFF, 'unknown')
+
+
+def test_iter_defined():
+    defined = list(big5.iter_defined(0xA440, 0xA4FE))
+    assert defined[0] == (0xA440, '一')
+    for code, c in defined:
+        assert big5.query_chr(code) == c
+    assert dict(big5.iter_defined(0xA2CC, 0xA2CE)) == {0xA2CC: '〸', 0xA2CD: '〹', 0xA2CE: '〺'}
+    assert len(list(big5.iter_defined())) == big5.get_count() + len(big5._build_alphabet_by_codes_between(0xC67F, 0xC93F))
+    assert list(big5.iter_defined(0xA3C0, 0xA3FE)) == []
+
+
+def test_truncate_to_bytes():
+    assert big5.truncate_to_bytes('abc中國', 6) == 'abc中'
+    assert big5.truncate_to_bytes('〸〹〺', 5) == '〸〹'
+    assert big5.truncate_to_bytes('abc中國卄', 7) == 'abc中國'
+
+    with pytest.raises(Big5EncodeError):
+        big5.truncate_to_bytes('abc卄中國', 7)
+
+
+def test_record():
+    bs = big5.encode_record(['abc', '中國'], [4, 5])
+    assert bs == b'abc ' + big5.encode('中國') + b' '
+    assert big5.decode_record(bs, [4, 5]) == ['abc', '中國']
+    assert big5.encode_record(['中國人'], [5], truncate=True) == big5.encode('中國') + b' '
+
+
+def test_pack():
+    bs = big5.pack('abc中國漢字')
+    assert len(bs) == 14
+    assert big5.unpack(bs) == 'abc中國漢字'
+    assert big5.unpack(bs + big5.pack('a')) == 'abc中國漢字' + 'a'
+    assert big5.pack('') == b''
+    assert big5.unpack(b'') == ''
+    alphabet = ''.join(big5.get_alphabet())
+    assert big5.unpack(big5.pack(alphabet)) == alphabet
+
+    packer = big5.IncrementalPacker()
+    unpacker = big5.IncrementalUnpacker()
+    cs = ''
+    for c in 'abc中國漢字' * 3:
+        cs += unpacker.unpack(packer.pack(c))
+    cs += unpacker.unpack(packer.pack('', final=True), final=True)
+    assert cs == 'abc中國漢字' * 3
+
+    with pytest.raises(Big5EncodeError) as info:
+        big5.pack('中国')
+    assert info.value.position == 1
+    with pytest.raises(Big5EncodeError) as info:
+        big5.IncrementalPacker().pack('abcd' + '中国', final=True)
+    assert info.value.position == 5
+    with pytest.raises(Big5DecodeError) as info:
+        big5.unpack(bs[:10])
+    assert info.value.position == 7
+    with pytest.raises(Big5DecodeError) as info:
+        big5.unpack(bs + b'\xfe\xff\xff\xff\xff\xff\xff')
+    assert info.value.position == 14
+
+
+def test_category_counter():
+    counter = big5.CategoryCounter()
+    counter.update('abc中國中')
+    counter.update('乂😈卄')
+    assert counter.get_category_counts() == {'other': 0, 'level-1': 3, 'level-2': 1, None: 3, 'unencodable': 2}
+    assert counter.most_common(category='level-1') == [('中', 2), ('國', 1)]
+
+
 def test_unicode():
     alphabet_other = []
     alphabet_level_1 = []
@@ -0,0 +1,65 @@
+import io
+
+import pytest
+
+from character_encoding_utils import checkpoint, ksx1001, shiftjis
+from character_encoding_utils.checkpoint import CheckpointException
+
+
+def test_read_chars():
+    cs = ('abc日本語ｱｲｳ¥‾' * 3001)[:-5]
+    bs = shiftjis.encode(cs)
+    file = io.BytesIO(bs)
+    index = checkpoint.build_index(file, 'shiftjis', interval=100)
+    assert index.char_count == len(cs)
+    assert index.byte_count == len(bs)
+    assert len(index.byte_offsets) == len(cs) // 100 + 1
+    for i, byte_offset in enumerate(index.byte_offsets):
+        assert byte_offset == len(shiftjis.encode(cs[:i * 100]))
+
+    for start, end in [(0, 0), (0, 10), (99, 101), (100, 200), (1234, 5678), (len(cs) - 3, len(cs))]:
+        assert checkpoint.read_chars(file, index, start, end) == cs[start:end]
+    assert checkpoint.read_chars(file, index, 29000) == cs[29000:]
+
+    with pytest.raises(CheckpointException):
+        checkpoint.read_chars(file, index, 10, 5)
+    with pytest.raises(CheckpointException):
+        checkpoint.read_chars(file, index, 0, len(cs) + 1)
+
+
+def test_read_chars_filler():
+    cs = '가똠힣 ㄱ\u3164a' * 1000
+    file = io.BytesIO(ksx1001.encode(cs))
+    index = checkpoint.build_index(file, 'ksx1001', interval=7)
+    assert checkpoint.read_chars(file, index, 3, 4000) == cs[3:4000]
+
+    # 没有终声的组合音节跨越读取的分块
+    cs = '꺠' * 20000
+    file = io.BytesIO(ksx1001.encode(cs))
+    index = checkpoint.build_index(file, 'ksx1001', interval=1000)
+    assert index.char_count == len(cs)
+    assert checkpoint.read_chars(file, index, 8190, 8200) == cs[8190:8200]
+
+
+def test_dump_and_load():
+    file = io.BytesIO('中文abc'.encode('gb2312') * 1000)
+    index = checkpoint.build_index(file, 'gb2312', interval=64)
+    index_file = io.BytesIO()
+    checkpoint.dump_index(index, index_file)
+    index_file.seek(0)
+    assert checkpoint.load_index(index_file) == index
+
+    with pytest.raises(CheckpointException):
+        checkpoint.load_index(io.BytesIO(index_file.getvalue()[:-1]))
+    with pytest.raises(CheckpointException):
+        checkpoint.load_index(io.BytesIO(b'\x00' * 64))
+
+
+def test_build_index_errors():
+    with pytest.raises(CheckpointException):
+        checkpoint.build_index(io.BytesIO(b''), 'utf-8')
+    with pytest.raises(CheckpointException):
+        checkpoint.build_index(io.BytesIO(b''), 'big5', interval=0)
+    with pytest.raises(shiftjis.ShiftJISDecodeError) as info:
+        checkpoint.build_index(io.BytesIO(b'a' * 100000 + b'\xff'), 'shiftjis')
+    assert info.value.position == 100000
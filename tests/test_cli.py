@@ -0,0 +1,102 @@
+from pathlib import Path
+
+import pytest
+
+from character_encoding_utils import cli
+
+
+def test_verify(tmp_path: Path, capsys: pytest.CaptureFixture[str]):
+    tmp_path.joinpath('a.txt').write_bytes('abc中国'.encode('gb2312') * 100)
+    tmp_path.joinpath('sub').mkdir()
+    tmp_path.joinpath('sub', 'b.txt').write_bytes(b'abc\xd6\xd0\xb9')
+    tmp_path.joinpath('sub', 'c.dat').write_bytes(b'abc')
+
+    assert cli.main(['verify', str(tmp_path), '--encoding', 'gb2312', '--workers', '1']) == 1
+    out = capsys.readouterr().out
+    assert f"FAIL {tmp_path.joinpath('sub', 'b.txt')}: decode failed:" in out
+    assert 'verified 3 files, 709 bytes' in out
+    assert '1 failed' in out
+
+    assert cli.main(['verify', str(tmp_path), '--encoding', 'gb2312', '--workers', '2', '--include', '*.dat', '--include', 'a.*']) == 0
+    out = capsys.readouterr().out
+    assert 'FAIL' not in out
+    assert 'verified 2 files, 703 bytes' in out
+
+    assert cli.main(['verify', str(tmp_path.joinpath('a.txt')), '--encoding', 'gb2312', '--workers', '1']) == 0
+    out = capsys.readouterr().out
+    assert 'verified 1 files, 700 bytes' in out
+
+
+def test_verify_arguments(tmp_path: Path, capsys: pytest.CaptureFixture[str]):
+    with pytest.raises(SystemExit):
+        cli.main(['verify', '.', '--encoding', 'utf-8'])
+    assert cli.main(['verify', '.', '--encoding', 'gb2312', '--workers', '0']) == 2
+
+    assert cli.main(['verify', str(tmp_path.joinpath('missing')), '--encoding', 'gb2312']) == 2
+    captured = capsys.readouterr()
+    assert 'does not exist' in captured.err
+    assert 'verified' not in captured.out
+
+
+def test_convert(tmp_path: Path, capsys: pytest.CaptureFixture[str]):
+    source_path = tmp_path.joinpath('source')
+    source_path.joinpath('sub').mkdir(parents=True)
+    source_path.joinpath('a.txt').write_text('abc中国' * 50000, 'utf-8')
+    source_path.joinpath('sub', 'b.txt').write_text('abc中國', 'utf-8')
+    target_path = tmp_path.joinpath('target')
+
+    assert cli.main(['convert', str(source_path), str(target_path), '--from', 'utf-8', '--to', 'gb2312', '--workers', '1']) == 1
+    err = capsys.readouterr().err
+    assert f"FAIL {source_path.joinpath('sub', 'b.txt')}: encode failed at character 4: illegal multibyte sequence" in err
+    assert 'converted 2 files' in err
+    assert '1 failed' in err
+    assert target_path.joinpath('a.txt').read_bytes() == 'abc中国'.encode('gb2312') * 50000
+    assert not target_path.joinpath('sub', 'b.txt').exists()
+
+    assert cli.main(['convert', str(source_path), str(target_path), '--from', 'utf-8', '--to', 'gb2312', '--errors', 'replace', '--workers', '2']) == 0
+    assert target_path.joinpath('sub', 'b.txt').read_bytes() == 'abc中?'.encode('gb2312')
+    capsys.readouterr()
+
+    assert cli.main(['convert', str(target_path.joinpath('a.txt')), str(tmp_path.joinpath('a.txt')), '--from', 'gb2312', '--to', 'utf-8']) == 0
+    assert tmp_path.joinpath('a.txt').read_text('utf-8') == 'abc中国' * 50000
+
+
+def test_convert_decode_errors(tmp_path: Path, capsys: pytest.CaptureFixture[str]):
+    tmp_path.joinpath('a.txt').write_bytes(b'abc\xb0\xa1' * 40000 + b'\xff\xffxyz\xb0')
+
+    assert cli.main(['convert', str(tmp_path.joinpath('a.txt')), str(tmp_path.joinpath('b.txt')), '--from', 'gb2312', '--to', 'utf-8']) == 1
+    assert 'decode failed at byte 200000:' in capsys.readouterr().err
+    assert not tmp_path.joinpath('b.txt').exists()
+
+    assert cli.main(['convert', str(tmp_path.joinpath('a.txt')), str(tmp_path.joinpath('b.txt')), '--from', 'gb2312', '--to', 'utf-8', '--errors', 'replace']) == 0
+    assert tmp_path.joinpath('b.txt').read_text('utf-8') == 'abc啊' * 40000 + '�xyz�'
+
+    assert cli.main(['convert', str(tmp_path.joinpath('a.txt')), str(tmp_path.joinpath('b.txt')), '--from', 'gb2312', '--to', 'utf-8', '--errors', 'ignore']) == 0
+    assert tmp_path.joinpath('b.txt').read_text('utf-8') == 'abc啊' * 40000 + 'xyz'
+
+    tmp_path.joinpath('c.txt').write_bytes('中文'.encode('utf-8') * 40000 + b'\xe4\xb8')
+    assert cli.main(['convert', str(tmp_path.joinpath('c.txt')), str(tmp_path.joinpath('d.txt')), '--from', 'utf-8', '--to', 'big5']) == 1
+    assert 'decode failed at byte 240000:' in capsys.readouterr().err
+
+
+def test_convert_filler(tmp_path: Path, capsys: pytest.CaptureFixture[str]):
+    # 没有终声的组合音节以 Hangul Filler 结尾，跨越读取的分块时不能被拆开
+    cs = '꺠' * (cli._CHUNK_SIZE // 4)
+    tmp_path.joinpath('a.txt').write_text(cs, 'ksx1001')
+    for errors in ['strict', 'replace']:
+        assert cli.main(['convert', str(tmp_path.joinpath('a.txt')), str(tmp_path.joinpath('b.txt')), '--from', 'ksx1001', '--to', 'utf-8', '--errors', errors]) == 0
+        assert 'FAIL' not in capsys.readouterr().err
+        assert tmp_path.joinpath('b.txt').read_text('utf-8') == cs
+
+
+def test_convert_arguments(tmp_path: Path, capsys: pytest.CaptureFixture[str]):
+    with pytest.raises(SystemExit):
+        cli.main(['convert', '.', 'out', '--from', 'latin-1', '--to', 'gb2312'])
+    for target in [str(tmp_path.joinpath('out')), '-']:
+        assert cli.main(['convert', str(tmp_path.joinpath('missing')), target, '--from', 'gb2312', '--to', 'utf-8']) == 2
+        captured = capsys.readouterr()
+        assert 'does not exist' in captured.err
+        assert 'converted' not in captured.err
+    assert not tmp_path.joinpath('out').exists()
+    assert cli.main(['convert', str(tmp_path), str(tmp_path.joinpath('out')), '--from', 'utf-8', '--to', 'gb2312']) == 2
+    assert cli.main(['convert', str(tmp_path), str(tmp_path), '--from', 'utf-8', '--to', 'gb2312']) == 2
@@ -0,0 +1,41 @@
+from character_encoding_utils import detector
+
+
+def test_detect():
+    cases = {
+        'gb2312': '中华人民共和国是工人阶级领导的、以工农联盟为基础的人民民主专政的社会主义国家。'.encode('gb2312'),
+        'big5': '中華民國憲法第一條，中華民國基於三民主義，為民有民治民享之民主共和國。'.encode('big5'),
+        'shiftjis': '日本国民は、正当に選挙された国会における代表者を通じて行動し、われらとわれらの子孫のために'.encode('shift-jis'),
+        'ksx1001': '대한민국은 민주공화국이다. 대한민국의 주권은 국민에게 있고, 모든 권력은 국민으로부터 나온다.'.encode('ksx1001'),
+    }
+    for encoding, bs in cases.items():
+        candidates = detector.detect(bs)
+        assert len(candidates) == 4
+        assert candidates[0].encoding == encoding
+        assert candidates[0].error_count == 0
+        assert candidates[0].score > candidates[1].score
+        assert [candidate.score for candidate in candidates] == sorted([candidate.score for candidate in candidates], reverse=True)
+
+
+def test_detect_category_counts():
+    candidates = {candidate.encoding: candidate for candidate in detector.detect('abc中国魍'.encode('gb2312'))}
+    assert candidates['gb2312'].category_counts == {'other': 0, 'level-1': 2, 'level-2': 1}
+
+
+def test_detect_ascii():
+    candidates = detector.detect(b'hello world')
+    assert len(candidates) == 4
+    for candidate in candidates:
+        assert candidate.score == 1.0
+        assert candidate.error_count == 0
+
+
+def test_detect_sample_size():
+    bs = '中文'.encode('gb2312') * 100 + 'にほんご'.encode('shift-jis') * 1000
+    assert detector.detect(bs, sample_size=400)[0].encoding == 'gb2312'
+    assert detector.detect(bs, sample_size=None)[0].encoding == 'shiftjis'
+
+    # 截断处的半个字符不算作错误
+    candidates = detector.detect('中文'.encode('gb2312') * 100, sample_size=101)
+    assert candidates[0].encoding == 'gb2312'
+    assert candidates[0].error_count == 0
@@ -1,3 +1,5 @@
+import asyncio
+
 import pytest
 
 from character_encoding_utils import gb2312
@@ -21,6 +23,135 @@ def test_codec():
     assert info.value.reason == 'incomplete multibyte sequence'
 
 
+def test_codec_error_position():
+    for cs, c, position in [
+        ('abc中国가d', '가', 5),
+        ('中😈', '😈', 1),
+        ('가', '가', 0),
+    ]:
+        with pytest.raises(GB2312EncodeError) as info:
+            gb2312.encode(cs)
+        assert info.value.obj == c
+        assert info.value.position == position
+
+    for bs, obj, position, reason in [
+        (b'\xd6\xd0\xa2\xa1abc', b'\xa2\xa1', 2, 'illegal multibyte sequence'),
+        (b'ab\xd6\xd0\xff\xfe', b'\xff\xfe', 4, 'illegal multibyte sequence'),
+        (b'\xd6\xd0a\x80b', b'\x80b', 3, 'illegal multibyte sequence'),
+        (b'\xd6\xd0\xb9\xfa\xd6', b'\xd6', 4, 'incomplete multibyte sequence'),
+    ]:
+        with pytest.raises(GB2312DecodeError) as info:
+            gb2312.decode(bs)
+        assert info.value.obj == obj
+        assert info.value.position == position
+        assert info.value.reason == reason
+
+
+def test_incremental_decoder():
+    bs = b'abc\xd6\xd0\xb9\xfa'
+    for size in range(1, len(bs) + 1):
+        decoder = gb2312.IncrementalDecoder()
+        cs = ''.join(decoder.decode(bs[i:i + size]) for i in range(0, len(bs), size))
+        cs += decoder.decode(b'', final=True)
+        assert cs == 'abc中国'
+
+    decoder = gb2312.IncrementalDecoder()
+    assert decoder.decode(b'abc') == 'abc'
+    with pytest.raises(GB2312DecodeError) as info:
+        decoder.decode(b'\xd6\xd0\xb9', final=True)
+    assert info.value.position == 5
+
+
+def test_codec_cache():
+    cache = gb2312.CodecCache(maxsize=2, max_length=8)
+    bs = gb2312.encode('abc中国')
+    for _ in range(3):
+        assert cache.encode('abc中国') == bs
+        assert cache.decode(bytearray(bs)) == 'abc中国'
+    assert cache.cache_info()['encode'].hits == 2
+    assert cache.cache_info()['decode'] == (2, 1, 2, 1)
+    assert cache.decode(bs * 2) == 'abc中国' * 2
+    assert cache.cache_info()['decode'].currsize == 1
+
+    with pytest.raises(GB2312DecodeError):
+        cache.decode(b'\xd6\xd0\xb9')
+    cache.cache_clear()
+    assert cache.cache_info()['encode'] == (0, 0, 2, 0)
+
+
+def test_stream():
+    class StreamWriter:
+        def __init__(self):
+            self.buffer = bytearray()
+            self.drain_count = 0
+
+        def write(self, bs: bytes):
+            self.buffer.extend(bs)
+
+        async def drain(self):
+            self.drain_count += 1
+
+    async def run():
+        reader = asyncio.StreamReader()
+        reader.feed_data(b'abc\xd6\xd0\xb9\xfa')
+        reader.feed_eof()
+        cs = ''.join([chunk async for chunk in gb2312.decode_stream(reader, chunk_size=3)])
+
+        writer = StreamWriter()
+        await gb2312.encode_stream(writer, cs)
+        return cs, writer
+
+    cs, writer = asyncio.run(run())
+    assert cs == 'abc中国'
+    assert writer.buffer == b'abc\xd6\xd0\xb9\xfa'
+    assert writer.drain_count == 1
+
+
+def test_many():
+    css = ['abc中国', 'abc', ''] * 50
+    bss = [b'abc\xd6\xd0\xb9\xfa', b'abc', b''] * 50
+    for workers in [None, 1, 4]:
+        assert gb2312.encode_many(css, workers=workers) == bss
+        assert gb2312.decode_many(bss, workers=workers) == css
+
+    with pytest.raises(GB2312EncodeError):
+        gb2312.encode_many(['abc中国', 'abc가'], workers=2)
+    with pytest.raises(GB2312DecodeError):
+        gb2312.decode_many([b'abc\xd6\xd0\xb9\xfa', b'abc\xd6\xd0\xb9'], workers=2)
+
+
+def test_columnar():
+    bs, offsets, errors = gb2312.encode_columnar(['abc中国', '', 'abc가', 'd'])
+    assert bs == b'abc\xd6\xd0\xb9\xfa' + b'd'
+    assert offsets == [0, len(b'abc\xd6\xd0\xb9\xfa'), len(b'abc\xd6\xd0\xb9\xfa'), len(b'abc\xd6\xd0\xb9\xfa'), len(b'abc\xd6\xd0\xb9\xfa') + 1]
+    assert errors[0] is None
+    assert errors[1] is None
+    assert isinstance(errors[2], GB2312EncodeError)
+    assert errors[2].position == 3
+    assert errors[3] is None
+
+    bs = b'abc\xd6\xd0\xb9\xfa' + b'\xd6\xd0\xb9' + b'd'
+    offsets = [0, len(b'abc\xd6\xd0\xb9\xfa'), len(b'abc\xd6\xd0\xb9\xfa') + len(b'\xd6\xd0\xb9'), len(bs)]
+    css, errors = gb2312.decode_columnar(bs, offsets)
+    assert css == ['abc中国', None, 'd']
+    assert errors[0] is None
+    assert isinstance(errors[1], GB2312DecodeError)
+    assert errors[1].position == 2
+    assert errors[2] is None
+
+    with pytest.raises(ValueError):
+        gb2312.decode_columnar(bs, [0, len(bs) + 1])
+
+    # 整体转换时，出错的行和包含换行的行逐行转换，不影响其他行
+    css = [f'中国{i}' + ('가' if i % 300 == 7 else '') + ('\n' if i % 500 == 3 else '') for i in range(2000)]
+    bs, offsets, errors = gb2312.encode_columnar(css)
+    assert [error is not None for error in errors] == [i % 300 == 7 for i in range(2000)]
+    assert errors[7].position == 3
+    decoded_css, errors = gb2312.decode_columnar(bs + b'\xd6', offsets + [len(bs) + 1])
+    assert decoded_css == ['' if i % 300 == 7 else cs for i, cs in enumerate(css)] + [None]
+    assert errors[-1].position == 0
+
+
 def test_query_coord():
     assert gb2312.query_coord('＄') == (1, 71)
     assert gb2312.query_coord('拿') == (36, 35)
@@ -68,6 +199,62 @@ def test_query_category():
     assert gb2312.query_category('가') is None
 
 
+def test_iter_runs():
+    assert list(gb2312.iter_runs('abc中国魍★가😈d')) == [
+        (None, 0, 3),
+        ('level-1', 3, 5),
+        ('level-2', 5, 6),
+        ('other', 6, 7),
+        ('unencodable', 7, 9),
+        (None, 9, 10),
+    ]
+    assert list(gb2312.iter_runs('')) == []
+
+
+def test_is_encodable():
+    assert gb2312.is_encodable('abc中国')
+    assert gb2312.is_encodable('')
+    assert not gb2312.is_encodable('中國😈a')
+    assert gb2312.find_unencodable('abc中国') == []
+    assert gb2312.find_unencodable('中國😈a') == [(1, '國'), (2, '😈')]
+
+
+def test_find():
+    bs = gb2312.encode('中国中国')
+    assert list(gb2312.finditer(bs, '国')) == [2, 6]
+    assert gb2312.find(bs, '国') == 2
+    assert gb2312.find(bs, '国', 0, 2) == -1
+    assert gb2312.find(b'\xb0\xd6\xd0\xd6\xd0', '中') == -1
+
+    # 与解码后查找的结果比较，覆盖跨过较长的双字节字符序列的情况
+    alphabet = gb2312.get_alphabet()
+    cs = ''.join(alphabet[(index * 7919) % len(alphabet)] for index in range(2000)) + '\n' + ''.join(alphabet[:1000])
+    bs = gb2312.encode(cs)
+    for sub in {cs[1500:1501], cs[1900:1902], alphabet[500], alphabet[-1]}:
+        expected = []
+        index = cs.find(sub)
+        while index != -1:
+            expected.append(len(gb2312.encode(cs[:index])))
+            index = cs.find(sub, index + len(sub))
+        assert list(gb2312.finditer(bs, sub)) == expected
+
+    with pytest.raises(GB2312EncodeError):
+        gb2312.find(bs, '國')
+    with pytest.raises(ValueError):
+        gb2312.find(bs, '')
+
+
+def test_sort_key():
+    # 一级汉字按拼音排序
+    css = ['中', '啊', 'abc', '魍', '阿', '中a', '😈', '가', '']
+    assert sorted(css, key=gb2312.sort_key) == ['', 'abc', '啊', '阿', '中', '中a', '魍', '가', '😈']
+    assert gb2312.sort_key('a中') == b'\x00a\xd6\xd0'
+    assert gb2312.sort_key('가') == b'\xff\xff\x00\xac\x00'
+    assert gb2312.sort_keys(css) == [gb2312.sort_key(cs) for cs in css]
+    assert gb2312.sort_keys(['a中', '国']) == [b'\x00a\xd6\xd0', b'\xb9\xfa']
+    assert gb2312.sort_keys([]) == []
+
+
 def test_alphabet():
     alphabet = gb2312.get_alphabet_other()
     assert len(alphabet) == 682
@@ -105,6 +292,154 @@ def test_count():
     assert gb2312.get_count() == 7445
 
 
+def test_index():
+    alphabet = gb2312.get_alphabet()
+    for index, c in enumerate(alphabet):
+        assert gb2312.index_of(c) == index
+        assert gb2312.char_at(index) == c
+
+    assert gb2312.index_of('啊', 'level-1') == 0
+    assert gb2312.char_at(0, 'level-1') == '啊'
+    assert gb2312.index_of('啊') == gb2312.get_other_count()
+
+    with pytest.raises(GB2312Exception):
+        gb2312.index_of('가')
+    with pytest.raises(GB2312Exception):
+        gb2312.index_of('啊', 'other')
+    with pytest.raises(GB2312Exception):
+        gb2312.index_of('啊', 'unknown')
+    with pytest.raises(GB2312Exception):
+        gb2312.index_of('😈')
+    with pytest.raises(GB2312Exception):
+        gb2312.index_of('abc')
+    with pytest.raises(GB2312Exception):
+        gb2312.char_at(-1)
+    with pytest.raises(GB2312Exception):
+        gb2312.char_at(len(alphabet))
+
+
+def test_chars_in_unicode_range():
+    alphabet = gb2312.get_alphabet()
+    chars = gb2312.chars_in_unicode_range(0x4E00, 0x9FFF)
+    assert chars[:2] == ['一', '丁']
+    assert chars == sorted(c for c in alphabet if 0x4E00 <= ord(c) <= 0x9FFF)
+    assert gb2312.chars_in_unicode_range(0x4E00, 0x9FFF, 'level-1') == sorted(c for c in chars if gb2312.query_category(c) == 'level-1')
+    assert gb2312.chars_in_unicode_range(0x4E00, 0x9FFF, 'other') == []
+    assert gb2312.chars_in_unicode_range(0, 0x10FFFF) == sorted(alphabet)
+    assert gb2312.chars_in_unicode_range(0x1F600, 0x1F64F) == []
+
+    with pytest.raises(GB2312Exception):
+        gb2312.chars_in_unicode_range(0x9FFF, 0x4E00)
+    with pytest.raises(GB2312Exception):
+        gb2312.chars_in_unicode_range(0, 0x110000)
+    with pytest.raises(GB2312Exception):
+        gb2312.chars_in_unicode_range(0, 0xFFFF, 'unknown')
+
+
+def test_iter_defined():
+    defined = list(gb2312.iter_defined(16, 16))
+    assert defined[0] == ((16, 1), '啊')
+    assert len(defined) == 94
+    for (row, col), c in gb2312.iter_defined(1, 9):
+        assert gb2312.query_chr(row, col) == c
+    assert ''.join(c for _, c in gb2312.iter_defined()) == ''.join(gb2312.get_alphabet())
+    assert list(gb2312.iter_defined(10, 15)) == []
+
+    with pytest.raises(GB2312Exception):
+        list(gb2312.iter_defined(0, 94))
+
+
+def test_truncate_to_bytes():
+    assert gb2312.truncate_to_bytes('abc中国', 7) == 'abc中国'
+    assert gb2312.truncate_to_bytes('abc中国', 6) == 'abc中'
+    assert gb2312.truncate_to_bytes('abc中国', 4) == 'abc'
+    assert gb2312.truncate_to_bytes('abc中国', 0) == ''
+    assert gb2312.truncate_to_bytes('abc中国가', 6) == 'abc中'
+    text = 'a中b国c' * 3
+    for max_bytes in range(25):
+        cs = gb2312.truncate_to_bytes(text, max_bytes)
+        assert text.startswith(cs)
+        assert len(gb2312.encode(cs)) <= max_bytes
+        assert cs == text or len(gb2312.encode(text[:len(cs) + 1])) > max_bytes
+
+    with pytest.raises(GB2312EncodeError):
+        gb2312.truncate_to_bytes('abc가中国', 7)
+    with pytest.raises(ValueError):
+        gb2312.truncate_to_bytes('abc', -1)
+
+
+def test_record():
+    bs = gb2312.encode_record(['abc', '中国', ''], [5, 4, 2])
+    assert bs == b'abc  ' + gb2312.encode('中国') + b'  '
+    assert gb2312.decode_record(bs, [5, 4, 2]) == ['abc', '中国', '']
+    assert gb2312.encode_record(['中国人'], [5], truncate=True) == gb2312.encode('中国') + b' '
+    assert gb2312.encode_record(['中'], [3], padding=b'\x00') == gb2312.encode('中') + b'\x00'
+
+    with pytest.raises(ValueError):
+        gb2312.encode_record(['中国人'], [5])
+    with pytest.raises(ValueError):
+        gb2312.encode_record(['a', 'b'], [1])
+    with pytest.raises(ValueError):
+        gb2312.encode_record(['a'], [1], padding=b'@')
+    with pytest.raises(ValueError):
+        gb2312.decode_record(b'abc', [2])
+    with pytest.raises(GB2312DecodeError) as info:
+        gb2312.decode_record(b'abc\xd6\xd0\xd6', [2, 4])
+    assert info.value.position == 5
+
+
+def test_pack():
+    bs = gb2312.pack('abc中国汉字')
+    assert len(bs) == 14
+    assert gb2312.unpack(bs) == 'abc中国汉字'
+    assert gb2312.unpack(bs + gb2312.pack('a')) == 'abc中国汉字' + 'a'
+    assert gb2312.pack('') == b''
+    assert gb2312.unpack(b'') == ''
+    alphabet = ''.join(gb2312.get_alphabet())
+    assert gb2312.unpack(gb2312.pack(alphabet)) == alphabet
+
+    packer = gb2312.IncrementalPacker()
+    unpacker = gb2312.IncrementalUnpacker()
+    cs = ''
+    for c in 'abc中国汉字' * 3:
+        cs += unpacker.unpack(packer.pack(c))
+    cs += unpacker.unpack(packer.pack('', final=True), final=True)
+    assert cs == 'abc中国汉字' * 3
+
+    with pytest.raises(GB2312EncodeError) as info:
+        gb2312.pack('中國')
+    assert info.value.position == 1
+    with pytest.raises(GB2312EncodeError) as info:
+        gb2312.IncrementalPacker().pack('abcd' + '中國', final=True)
+    assert info.value.position == 5
+    with pytest.raises(GB2312DecodeError) as info:
+        gb2312.unpack(bs[:10])
+    assert info.value.position == 7
+    with pytest.raises(GB2312DecodeError) as info:
+        gb2312.unpack(bs + b'\xfe\xff\xff\xff\xff\xff\xff')
+    assert info.value.position == 14
+
+
+def test_category_counter():
+    counter = gb2312.CategoryCounter()
+    counter.update('abc中国中')
+    counter.update('魍😈가')
+    assert counter.get_category_counts() == {'other': 0, 'level-1': 3, 'level-2': 1, None: 3, 'unencodable': 2}
+    assert counter.most_common(1) == [('中', 2)]
+    assert counter.most_common(category='level-1') == [('中', 2), ('国', 1)]
+    assert counter.most_common(category='other') == []
+
+    counter = gb2312.CategoryCounter()
+    bs = gb2312.encode('中国魍，') * 3
+    for i in range(0, len(bs), 3):
+        counter.update_bytes(bs[i:i + 3])
+    counter.update_bytes(b'', final=True)
+    assert counter.get_category_counts() == {'other': 3, 'level-1': 6, 'level-2': 3, None: 0, 'unencodable': 0}
+
+    with pytest.raises(GB2312Exception):
+        counter.most_common(category='unknown')
+
+
 def test_unicode():
     alphabet_other = []
     alphabet_level_1 = []
@@ -1,3 +1,5 @@
+import asyncio
+
 import pytest
 
 from character_encoding_utils import ksx1001
@@ -27,6 +29,147 @@ def test_codec():
         assert ksx1001.decode(ksx1001.encode(c)) == c
 
 
+def test_filler():
+    assert len(ksx1001._build_filler_syllables()) == 11172 - 2350
+    for c in ksx1001._build_filler_syllables():
+        assert ksx1001._compose_filler_syllable(c.encode('ksx1001')) == c
+    assert ksx1001._compose_filler_syllable(b'\xa4\xd4\xa4\xa1\xa4\xbf\xa4\xd4') == '가'
+    assert ksx1001._compose_filler_syllable(b'\xa4\xd4\xa4\xbf\xa4\xbf\xa4\xd4') is None
+    assert sum(len(indexes) for indexes in ksx1001._get_filler_jamo_indexes()) == 256 * 3
+    assert ksx1001.encode('똠') == b'\xa4\xd4\xa4\xa8\xa4\xc7\xa4\xb1'
+    assert ksx1001.decode(b'\xa4\xd4\xa4\xa8\xa4\xc7\xa4\xb1') == '똠'
+
+    cs = chr(0x3164) + 'a똠가' + chr(0x3164) + 'b똠' + chr(0x3164)
+    assert ksx1001.decode(ksx1001.encode(cs)) == cs
+    assert ksx1001.decode(b'\xa4\xd4\xa4\xa8\xa4\xc7') == chr(0x3164) + 'ㄸㅗ'
+
+    with pytest.raises(KSX1001DecodeError) as info:
+        ksx1001.decode(b'a\xa4\xd4\xa4\xa1\xa4\xa1\xa4\xa1')
+    assert info.value.obj == b'\xa4\xd4\xa4\xa1\xa4\xa1\xa4\xa1'
+    assert info.value.position == 1
+
+    # 长文本中的 Hangul Filler 和错误字节，开销与字节数成正比
+    cs = '똠' + '가a' * 100000 + chr(0x3164) + 'b똠' + ksx1001._build_filler_syllables()
+    bs = ksx1001.encode(cs)
+    assert ksx1001.decode(bs) == cs
+
+    with pytest.raises(KSX1001DecodeError) as info:
+        ksx1001.decode(bs + b'\xff\xfe' + bs)
+    assert info.value.obj == b'\xff\xfe'
+    assert info.value.position == len(bs)
+
+    with pytest.raises(KSX1001Exception):
+        ksx1001.query_coord('똠')
+
+
+def test_incremental_decoder():
+    bs = b'abc\xb0\xa1\xc3\xc8\xa4\xd4\xa4\xa8\xa4\xc7\xa4\xb1'
+    for size in range(1, len(bs) + 1):
+        decoder = ksx1001.IncrementalDecoder()
+        cs = ''.join(decoder.decode(bs[i:i + size]) for i in range(0, len(bs), size))
+        cs += decoder.decode(b'', final=True)
+        assert cs == 'abc가쳰똠'
+
+    # 没有终声的组合音节以 Hangul Filler 结尾，不能被当作尚未接收完整的序列
+    bs = ksx1001.encode('꺠凄겍ㅤ')
+    for size in range(1, len(bs) + 1):
+        decoder = ksx1001.IncrementalDecoder()
+        cs = ''.join(decoder.decode(bs[i:i + size]) for i in range(0, len(bs), size))
+        cs += decoder.decode(b'', final=True)
+        assert cs == '꺠凄겍ㅤ'
+    bs = ksx1001.encode('꺠' * 5000)
+    decoder = ksx1001.IncrementalDecoder()
+    cs = ''.join(decoder.decode(bs[i:i + 8192]) for i in range(0, len(bs), 8192))
+    assert cs + decoder.decode(b'', final=True) == '꺠' * 5000
+
+    decoder = ksx1001.IncrementalDecoder()
+    assert decoder.decode(b'abc') == 'abc'
+    with pytest.raises(KSX1001DecodeError) as info:
+        decoder.decode(b'\xb0\xa1\xc3', final=True)
+    assert info.value.position == 5
+
+
+def test_codec_cache():
+    cache = ksx1001.CodecCache(maxsize=2, max_length=8)
+    bs = ksx1001.encode('abc가각')
+    for _ in range(3):
+        assert cache.encode('abc가각') == bs
+        assert cache.decode(bytearray(bs)) == 'abc가각'
+    assert cache.cache_info()['encode'].hits == 2
+    assert cache.cache_info()['decode'] == (2, 1, 2, 1)
+    assert cache.decode(bs * 2) == 'abc가각' * 2
+    assert cache.cache_info()['decode'].currsize == 1
+
+    with pytest.raises(KSX1001DecodeError):
+        cache.decode(b'\xb0\xa1\xb0')
+    cache.cache_clear()
+    assert cache.cache_info()['encode'] == (0, 0, 2, 0)
+
+
+def test_stream():
+    class StreamWriter:
+        def __init__(self):
+            self.buffer = bytearray()
+            self.drain_count = 0
+
+        def write(self, bs: bytes):
+            self.buffer.extend(bs)
+
+        async def drain(self):
+            self.drain_count += 1
+
+    async def run():
+        reader = asyncio.StreamReader()
+        reader.feed_data(b'abc\xb0\xa1\xc3\xc8\xa4\xd4\xa4\xa8\xa4\xc7\xa4\xb1')
+        reader.feed_eof()
+        cs = ''.join([chunk async for chunk in ksx1001.decode_stream(reader, chunk_size=3)])
+
+        writer = StreamWriter()
+        await ksx1001.encode_stream(writer, cs)
+        return cs, writer
+
+    cs, writer = asyncio.run(run())
+    assert cs == 'abc가쳰똠'
+    assert writer.buffer == b'abc\xb0\xa1\xc3\xc8\xa4\xd4\xa4\xa8\xa4\xc7\xa4\xb1'
+    assert writer.drain_count == 1
+
+
+def test_many():
+    css = ['abc가쳰', 'abc', ''] * 50
+    bss = [b'abc\xb0\xa1\xc3\xc8', b'abc', b''] * 50
+    for workers in [None, 1, 4]:
+        assert ksx1001.encode_many(css, workers=workers) == bss
+        assert ksx1001.decode_many(bss, workers=workers) == css
+
+    with pytest.raises(KSX1001EncodeError):
+        ksx1001.encode_many(['abc가쳰', 'abc😈'], workers=2)
+    with pytest.raises(KSX1001DecodeError):
+        ksx1001.decode_many([b'abc\xb0\xa1\xc3\xc8', b'abc\xb0\xa1\xc3'], workers=2)
+
+
+def test_columnar():
+    bs, offsets, errors = ksx1001.encode_columnar(['abc가쳰', '', 'abc😈', 'd'])
+    assert bs == b'abc\xb0\xa1\xc3\xc8' + b'd'
+    assert offsets == [0, len(b'abc\xb0\xa1\xc3\xc8'), len(b'abc\xb0\xa1\xc3\xc8'), len(b'abc\xb0\xa1\xc3\xc8'), len(b'abc\xb0\xa1\xc3\xc8') + 1]
+    assert errors[0] is None
+    assert errors[1] is None
+    assert isinstance(errors[2], KSX1001EncodeError)
+    assert errors[2].position == 3
+    assert errors[3] is None
+
+    bs = b'abc\xb0\xa1\xc3\xc8' + b'\xb0\xa1\xc3' + b'd'
+    offsets = [0, len(b'abc\xb0\xa1\xc3\xc8'), len(b'abc\xb0\xa1\xc3\xc8') + len(b'\xb0\xa1\xc3'), len(bs)]
+    css, errors = ksx1001.decode_columnar(bs, offsets)
+    assert css == ['abc가쳰', None, 'd']
+    assert errors[0] is None
+    assert isinstance(errors[1], KSX1001DecodeError)
+    assert errors[1].position == 2
+    assert errors[2] is None
+
+    with pytest.raises(ValueError):
+        ksx1001.decode_columnar(bs, [0, len(bs) + 1])
+
+
 def test_query_coord():
     assert ksx1001.query_coord('ㆌ') == (4, 92)
     assert ksx1001.query_coord('φ') == (5, 85)
@@ -76,6 +219,74 @@ def test_query_category():
     assert ksx1001.query_category('😈') is None
 
 
+def test_iter_runs():
+    assert list(ksx1001.iter_runs('abc가쳰똠絿ぜ😈d')) == [
+        (None, 0, 3),
+        ('syllable', 3, 5),
+        (None, 5, 6),
+        ('hanja', 6, 7),
+        ('other', 7, 8),
+        ('unencodable', 8, 9),
+        (None, 9, 10),
+    ]
+    assert list(ksx1001.iter_runs('')) == []
+
+
+def test_is_encodable():
+    assert ksx1001.is_encodable('abc가쳰中')
+    assert ksx1001.is_encodable('')
+    assert not ksx1001.is_encodable('가😈กa')
+    assert ksx1001.find_unencodable('abc가쳰中') == []
+    assert ksx1001.find_unencodable('가😈กa') == [(1, '😈'), (2, 'ก')]
+
+
+def test_find():
+    bs = ksx1001.encode('똠ㄷ')
+    assert list(ksx1001.finditer(bs, 'ㄷ')) == [8]
+    assert ksx1001.find(bs, 'ㄷ') == 8
+    assert ksx1001.find(bs, 'ㄷ', 0, 8) == -1
+    assert ksx1001.find(ksx1001.encode('똠'), 'ㄸ') == -1
+    # 单独出现的 Hangul Filler 和没有终声的组合音节之后是字符边界
+    assert list(ksx1001.finditer(ksx1001.encode('약ㅤ息궱'), '息궱')) == [4]
+    assert list(ksx1001.finditer(ksx1001.encode('꺠息궱'), '息궱')) == [8]
+
+    # 奇数位置开始的 Hangul Filler 序列
+    assert ksx1001.find(b'a' + ksx1001.encode('갂'), 'ㅤ') == -1
+    for prefix in [b'a', b'abc', b'abcde']:
+        bs = prefix + ksx1001.encode('똠ㄷ갂')
+        assert list(ksx1001.finditer(bs, 'ㄷ')) == [len(prefix) + 8]
+        assert ksx1001.find(bs, 'ㄱ') == -1
+        assert ksx1001.find(bs, 'ㅗ') == -1
+
+    # 与解码后查找的结果比较，覆盖跨过较长的双字节字符序列的情况
+    alphabet = ksx1001.get_alphabet()
+    cs = ''.join(alphabet[(index * 7919) % len(alphabet)] for index in range(2000)) + '\n' + ''.join(alphabet[:1000])
+    bs = ksx1001.encode(cs)
+    for sub in {cs[1500:1501], cs[1900:1902], alphabet[500], alphabet[-1]}:
+        expected = []
+        index = cs.find(sub)
+        while index != -1:
+            expected.append(len(ksx1001.encode(cs[:index])))
+            index = cs.find(sub, index + len(sub))
+        assert list(ksx1001.finditer(bs, sub)) == expected
+
+    with pytest.raises(KSX1001EncodeError):
+        ksx1001.find(bs, '😈')
+    with pytest.raises(ValueError):
+        ksx1001.find(bs, '')
+
+
+def test_sort_key():
+    # 音节按谚文顺序排序
+    css = ['나', '가', 'abc', '각', '紺', '가a', '😈', '']
+    assert sorted(css, key=ksx1001.sort_key) == ['', 'abc', '가', '가a', '각', '나', '紺', '😈']
+    assert ksx1001.sort_key('a가') == b'\x00a\xb0\xa1'
+    assert ksx1001.sort_key('똠') == b'\xa4\xd4\xa4\xa8\xa4\xc7\xa4\xb1'
+    assert ksx1001.sort_keys(css + ['똠']) == [ksx1001.sort_key(cs) for cs in css + ['똠']]
+    assert ksx1001.sort_keys(['a가', '쳰']) == [b'\x00a\xb0\xa1', b'\xc3\xc8']
+    assert ksx1001.sort_keys([]) == []
+
+
 def test_alphabet():
     alphabet = ksx1001.get_alphabet_other()
     assert len(alphabet) == 988
@@ -113,6 +324,124 @@ def test_count():
     assert ksx1001.get_count() == 8226
 
 
+def test_index():
+    alphabet = ksx1001.get_alphabet()
+    for index, c in enumerate(alphabet):
+        assert ksx1001.index_of(c) == index
+        assert ksx1001.char_at(index) == c
+
+    assert ksx1001.index_of('가', 'syllable') == 0
+    assert ksx1001.char_at(0, 'syllable') == '가'
+    assert ksx1001.index_of('가') == ksx1001.get_other_count()
+
+    with pytest.raises(KSX1001Exception):
+        ksx1001.index_of('똠')
+    with pytest.raises(KSX1001Exception):
+        ksx1001.index_of('가', 'hanja')
+    with pytest.raises(KSX1001Exception):
+        ksx1001.index_of('가', 'unknown')
+    with pytest.raises(KSX1001Exception):
+        ksx1001.index_of('😈')
+    with pytest.raises(KSX1001Exception):
+        ksx1001.index_of('abc')
+    with pytest.raises(KSX1001Exception):
+        ksx1001.char_at(-1)
+    with pytest.raises(KSX1001Exception):
+        ksx1001.char_at(len(alphabet))
+
+
+def test_chars_in_unicode_range():
+    alphabet = ksx1001.get_alphabet()
+    chars = ksx1001.chars_in_unicode_range(0x3130, 0x318F)
+    assert chars[:3] == ['ㄱ', 'ㄲ', 'ㄳ']
+    assert chars == sorted(c for c in alphabet if 0x3130 <= ord(c) <= 0x318F)
+    assert ksx1001.chars_in_unicode_range(0x3130, 0x318F, 'other') == sorted(c for c in chars if ksx1001.query_category(c) == 'other')
+    assert ksx1001.chars_in_unicode_range(0x3130, 0x318F, 'hanja') == []
+    assert ksx1001.chars_in_unicode_range(0, 0x10FFFF) == sorted(alphabet)
+    assert ksx1001.chars_in_unicode_range(0x1F600, 0x1F64F) == []
+
+    with pytest.raises(KSX1001Exception):
+        ksx1001.chars_in_unicode_range(0x9FFF, 0x4E00)
+    with pytest.raises(KSX1001Exception):
+        ksx1001.chars_in_unicode_range(0, 0x110000)
+    with pytest.raises(KSX1001Exception):
+        ksx1001.chars_in_unicode_range(0, 0xFFFF, 'unknown')
+
+
+def test_iter_defined():
+    assert list(ksx1001.iter_defined(16, 16))[0] == ((16, 1), '가')
+    assert dict(ksx1001.iter_defined(4, 4))[(4, 52)] == chr(0x3164)
+    for (row, col), c in ksx1001.iter_defined(1, 12):
+        assert ksx1001.query_chr(row, col) == c
+    assert ''.join(c for _, c in ksx1001.iter_defined()) == ''.join(ksx1001.get_alphabet())
+
+    with pytest.raises(KSX1001Exception):
+        list(ksx1001.iter_defined(1, 95))
+
+
+def test_truncate_to_bytes():
+    assert ksx1001.truncate_to_bytes('abc가똠', 12) == 'abc가'
+    assert ksx1001.truncate_to_bytes('abc가똠', 13) == 'abc가똠'
+    assert ksx1001.truncate_to_bytes('똠', 7) == ''
+
+    with pytest.raises(KSX1001EncodeError):
+        ksx1001.truncate_to_bytes('a😀', 3)
+
+
+def test_record():
+    bs = ksx1001.encode_record(['abc', '가똠'], [4, 12])
+    assert bs == b'abc ' + ksx1001.encode('가똠') + b'  '
+    assert ksx1001.decode_record(bs, [4, 12]) == ['abc', '가똠']
+    assert ksx1001.encode_record(['가똠'], [9], truncate=True) == ksx1001.encode('가') + b' ' * 7
+
+
+def test_pack():
+    bs = ksx1001.pack('abc한국어中')
+    assert len(bs) == 14
+    assert ksx1001.unpack(bs) == 'abc한국어中'
+    assert ksx1001.unpack(bs + ksx1001.pack('a')) == 'abc한국어中' + 'a'
+    assert ksx1001.pack('') == b''
+    assert ksx1001.unpack(b'') == ''
+    alphabet = ''.join(ksx1001.get_alphabet())
+    assert ksx1001.unpack(ksx1001.pack(alphabet)) == alphabet
+
+    packer = ksx1001.IncrementalPacker()
+    unpacker = ksx1001.IncrementalUnpacker()
+    cs = ''
+    for c in 'abc한국어中' * 3:
+        cs += unpacker.unpack(packer.pack(c))
+    cs += unpacker.unpack(packer.pack('', final=True), final=True)
+    assert cs == 'abc한국어中' * 3
+
+    with pytest.raises(KSX1001EncodeError) as info:
+        ksx1001.pack('한똠')
+    assert info.value.position == 1
+    with pytest.raises(KSX1001EncodeError) as info:
+        ksx1001.IncrementalPacker().pack('abcd' + '한똠', final=True)
+    assert info.value.position == 5
+    with pytest.raises(KSX1001DecodeError) as info:
+        ksx1001.unpack(bs[:10])
+    assert info.value.position == 7
+    with pytest.raises(KSX1001DecodeError) as info:
+        ksx1001.unpack(bs + b'\xfe\xff\xff\xff\xff\xff\xff')
+    assert info.value.position == 14
+
+
+def test_category_counter():
+    counter = ksx1001.CategoryCounter()
+    counter.update_bytes(ksx1001.encode('abc가가똠中'), final=True)
+    assert counter.get_category_counts() == {'other': 0, 'syllable': 2, 'hanja': 1, None: 4, 'unencodable': 0}
+    assert counter.most_common(category='syllable') == [('가', 2)]
+
+    counter = ksx1001.CategoryCounter()
+    bs = ksx1001.encode('꺠' * 5000)
+    for i in range(0, len(bs), 4096):
+        counter.update_bytes(bs[i:i + 4096])
+    counter.update_bytes(b'', final=True)
+    assert counter.get_category_counts()['unencodable'] == 0
+    assert sum(counter.get_category_counts().values()) == 5000
+
+
 def test_unicode():
     alphabet_other = []
     alphabet_syllable = []
@@ -0,0 +1,47 @@
+import pytest
+
+from character_encoding_utils import big5, gb2312, ksx1001, lookup, shiftjis
+from character_encoding_utils.lookup import Entry, LookupException
+
+
+def test_lookup():
+    assert lookup.lookup('中') == {
+        'gb2312': Entry('gb2312', 0xD6D0, (54, 48), 'level-1'),
+        'big5': Entry('big5', 0xA4A4, None, 'level-1'),
+        'shiftjis': Entry('shiftjis', 0x9286, None, 'double-byte-kanji'),
+        'ksx1001': Entry('ksx1001', 0xF1E9, (81, 73), 'hanja'),
+    }
+    assert lookup.lookup('A') == {
+        'shiftjis': Entry('shiftjis', 0x41, None, 'single-byte-ascii-printable'),
+    }
+    assert lookup.lookup('가') == {
+        'ksx1001': Entry('ksx1001', 0xB0A1, (16, 1), 'syllable'),
+    }
+    assert lookup.lookup('😀') == {}
+
+    with pytest.raises(LookupException):
+        lookup.lookup('ab')
+
+
+def test_lookup_consistency():
+    for c in '啊中國日本語ｱ가똠¥‾〸':
+        for encoding, entry in lookup.lookup(c).items():
+            if encoding == 'gb2312':
+                assert entry.coord == gb2312.query_coord(c)
+                assert entry.category == gb2312.query_category(c)
+            elif encoding == 'big5':
+                assert entry.code == big5.query_code(c)
+                assert entry.category == big5.query_category(c)
+            elif encoding == 'shiftjis':
+                assert entry.code == int.from_bytes(shiftjis.encode(c), 'big')
+                assert entry.category == shiftjis.query_category(c)
+            elif encoding == 'ksx1001':
+                assert entry.coord == ksx1001.query_coord(c)
+                assert entry.category == ksx1001.query_category(c)
+
+
+def test_lookup_all():
+    entries = lookup.lookup_all('a中')
+    assert len(entries) == 2
+    assert list(entries[0]) == ['shiftjis']
+    assert list(entries[1]) == lookup.get_encodings()
@@ -0,0 +1,58 @@
+import concurrent.futures
+import multiprocessing
+import os
+
+import pytest
+
+from character_encoding_utils import _shared, gb2312, lookup, memory
+
+
+def test_get_memory_usage():
+    usage = memory.get_memory_usage()
+    assert list(usage) == ['gb2312', 'big5', 'shiftjis', 'ksx1001', 'lookup']
+    assert usage['gb2312']['_alphabet_level_1'] < gb2312.get_level_1_count() * 4
+    for tables in usage.values():
+        for size in tables.values():
+            assert size >= 0
+
+    gb2312.iter_runs('abc')
+    assert memory.get_memory_usage()['gb2312']['_get_category_table'] > 0x10000
+    assert memory.get_total_memory_usage() == sum(sum(tables.values()) for tables in memory.get_memory_usage().values())
+
+
+def _check_attached(_: int) -> tuple[bool, int]:
+    from character_encoding_utils import _shared, gb2312
+    return _shared.attach() is not None, gb2312.get_count()
+
+
+def test_preload():
+    memory.preload()
+    for module in [gb2312, lookup]:
+        for name, value in vars(module).items():
+            if name.startswith('_get_') and hasattr(value, 'cache_info'):
+                assert value.cache_info().currsize == 1
+
+
+def test_publish_tables(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.delenv(_shared.ENVIRON_KEY, raising=False)
+    block = memory.publish_tables()
+    try:
+        assert os.environ[_shared.ENVIRON_KEY] == block.name
+        assert memory.attach_tables(block.name)
+        assert _shared.load(gb2312.__name__, '_alphabet_level_1') == ''.join(gb2312.get_alphabet_level_1())
+        assert _shared.load(gb2312.__name__, '_get_category_table') == gb2312._get_category_table()
+        assert _shared.load(lookup.__name__, '_get_code_tables') == lookup._get_code_tables()
+        assert _shared.load(gb2312.__name__, '_undefined') is None
+
+        with concurrent.futures.ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('spawn')) as executor:
+            assert executor.submit(_check_attached, 0).result() == (True, gb2312.get_count())
+    finally:
+        memory.release_tables(block)
+
+    # 释放之后启动的子进程不再尝试附加
+    assert _shared.ENVIRON_KEY not in os.environ
+    with concurrent.futures.ProcessPoolExecutor(1, mp_context=multiprocessing.get_context('spawn')) as executor:
+        assert executor.submit(_check_attached, 0).result() == (False, gb2312.get_count())
+
+    assert not memory.attach_tables('character_encoding_utils_missing')
+    _shared.attach.cache_clear()
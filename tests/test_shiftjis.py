@@ -1,7 +1,9 @@
+import asyncio
+
 import pytest
 
 from character_encoding_utils import shiftjis
-from character_encoding_utils.shiftjis import ShiftJISEncodeError, ShiftJISDecodeError
+from character_encoding_utils.shiftjis import ShiftJISException, ShiftJISEncodeError, ShiftJISDecodeError
 
 
 def test_codec():
@@ -37,6 +39,161 @@ def test_codec():
     assert shiftjis.decode(shiftjis.encode('¥')) == '¥'
     assert shiftjis.decode(shiftjis.encode('‾')) == '‾'
 
+    with pytest.raises(ShiftJISEncodeError) as info:
+        shiftjis.encode('ab가~\\')
+    assert info.value.obj == '가'
+    assert info.value.position == 2
+
+    with pytest.raises(ShiftJISEncodeError) as info:
+        shiftjis.encode('ab~가\\')
+    assert info.value.obj == '~'
+    assert info.value.position == 2
+
+    # '表' 的第二位字节是 0x5C
+    assert shiftjis.encode('表¥ｱ') == b'\x95\x5c\x5c\xb1'
+    assert shiftjis.decode(b'\x95\x5c\x5c\x7e\xb1') == '表¥‾ｱ'
+
+
+def test_incremental_decoder():
+    bs = b'abc\x93\xfa\x96\x7b'
+    for size in range(1, len(bs) + 1):
+        decoder = shiftjis.IncrementalDecoder()
+        cs = ''.join(decoder.decode(bs[i:i + size]) for i in range(0, len(bs), size))
+        cs += decoder.decode(b'', final=True)
+        assert cs == 'abc日本'
+
+    decoder = shiftjis.IncrementalDecoder()
+    assert decoder.decode(b'abc') == 'abc'
+    with pytest.raises(ShiftJISDecodeError) as info:
+        decoder.decode(b'\x93\xfa\x96', final=True)
+    assert info.value.position == 5
+
+
+def test_codec_cache():
+    cache = shiftjis.CodecCache(maxsize=2, max_length=8)
+    bs = shiftjis.encode('abc日本')
+    for _ in range(3):
+        assert cache.encode('abc日本') == bs
+        assert cache.decode(bytearray(bs)) == 'abc日本'
+    assert cache.cache_info()['encode'].hits == 2
+    assert cache.cache_info()['decode'] == (2, 1, 2, 1)
+    assert cache.decode(bs * 2) == 'abc日本' * 2
+    assert cache.cache_info()['decode'].currsize == 1
+
+    with pytest.raises(ShiftJISDecodeError):
+        cache.decode(b'\x93\xfa\x96')
+    cache.cache_clear()
+    assert cache.cache_info()['encode'] == (0, 0, 2, 0)
+
+
+def test_stream():
+    class StreamWriter:
+        def __init__(self):
+            self.buffer = bytearray()
+            self.drain_count = 0
+
+        def write(self, bs: bytes):
+            self.buffer.extend(bs)
+
+        async def drain(self):
+            self.drain_count += 1
+
+    async def run():
+        reader = asyncio.StreamReader()
+        reader.feed_data(b'abc\x93\xfa\x96\x7b')
+        reader.feed_eof()
+        cs = ''.join([chunk async for chunk in shiftjis.decode_stream(reader, chunk_size=3)])
+
+        writer = StreamWriter()
+        await shiftjis.encode_stream(writer, cs)
+        return cs, writer
+
+    cs, writer = asyncio.run(run())
+    assert cs == 'abc日本'
+    assert writer.buffer == b'abc\x93\xfa\x96\x7b'
+    assert writer.drain_count == 1
+
+
+def test_many():
+    css = ['abc日本', 'abc', ''] * 50
+    bss = [b'abc\x93\xfa\x96\x7b', b'abc', b''] * 50
+    for workers in [None, 1, 4]:
+        assert shiftjis.encode_many(css, workers=workers) == bss
+        assert shiftjis.decode_many(bss, workers=workers) == css
+
+    with pytest.raises(ShiftJISEncodeError):
+        shiftjis.encode_many(['abc日本', 'abc가'], workers=2)
+    with pytest.raises(ShiftJISDecodeError):
+        shiftjis.decode_many([b'abc\x93\xfa\x96\x7b', b'abc\x93\xfa\x96'], workers=2)
+
+
+def test_columnar():
+    bs, offsets, errors = shiftjis.encode_columnar(['abc日本', '', 'abc가', 'd'])
+    assert bs == b'abc\x93\xfa\x96\x7b' + b'd'
+    assert offsets == [0, len(b'abc\x93\xfa\x96\x7b'), len(b'abc\x93\xfa\x96\x7b'), len(b'abc\x93\xfa\x96\x7b'), len(b'abc\x93\xfa\x96\x7b') + 1]
+    assert errors[0] is None
+    assert errors[1] is None
+    assert isinstance(errors[2], ShiftJISEncodeError)
+    assert errors[2].position == 3
+    assert errors[3] is None
+
+    bs = b'abc\x93\xfa\x96\x7b' + b'\x93\xfa\x96' + b'd'
+    offsets = [0, len(b'abc\x93\xfa\x96\x7b'), len(b'abc\x93\xfa\x96\x7b') + len(b'\x93\xfa\x96'), len(bs)]
+    css, errors = shiftjis.decode_columnar(bs, offsets)
+    assert css == ['abc日本', None, 'd']
+    assert errors[0] is None
+    assert isinstance(errors[1], ShiftJISDecodeError)
+    assert errors[1].position == 2
+    assert errors[2] is None
+
+    with pytest.raises(ValueError):
+        shiftjis.decode_columnar(bs, [0, len(bs) + 1])
+
+
+def test_query_coord():
+    assert shiftjis.query_coord('、') == (1, 2)
+    assert shiftjis.query_coord('亜') == (16, 1)
+    assert shiftjis.query_coord('日') == (38, 92)
+    assert shiftjis.query_coord('熙') == (84, 6)
+    for code, c in shiftjis.iter_defined(0x8140, 0xFFFF):
+        row, col = shiftjis.query_coord(c)
+        assert c.encode('euc-jp') == bytes([row + 0xA0, col + 0xA0])
+    assert shiftjis.query_coords('日本語') == [(38, 92), (43, 60), (24, 76)]
+    assert shiftjis.query_coords('') == []
+
+    with pytest.raises(ShiftJISException):
+        shiftjis.query_coord('abc')
+    with pytest.raises(ShiftJISException):
+        shiftjis.query_coord('d')
+    with pytest.raises(ShiftJISException):
+        shiftjis.query_coord('ｱ')
+    with pytest.raises(ShiftJISException):
+        shiftjis.query_coord('가')
+    with pytest.raises(ShiftJISException):
+        shiftjis.query_coord('😈')
+    with pytest.raises(ShiftJISException) as info:
+        shiftjis.query_coords('日本a語')
+    assert 'position 2' in str(info.value)
+    with pytest.raises(ShiftJISException):
+        shiftjis.query_coords('日本😈')
+
+
+def test_query_chr():
+    assert shiftjis.query_chr(1, 2) == '、'
+    assert shiftjis.query_chr(4, 2) == 'あ'
+    assert shiftjis.query_chr(47, 51) == '腕'
+    assert shiftjis.query_chr(84, 6) == '熙'
+    assert shiftjis.query_chrs([(38, 92), (43, 60)]) == ['日', '本']
+
+    with pytest.raises(ShiftJISException):
+        shiftjis.query_chr(-1, 50)
+    with pytest.raises(ShiftJISException):
+        shiftjis.query_chr(20, 500)
+    with pytest.raises(ShiftJISException):
+        shiftjis.query_chr(84, 7)
+    with pytest.raises(ShiftJISException):
+        shiftjis.query_chrs([(38, 92), (94, 94)])
+
 
 def test_query_category():
     categories = shiftjis.get_categories()
@@ -55,6 +212,62 @@ def test_query_category():
     assert shiftjis.query_category('가') is None
 
 
+def test_iter_runs():
+    assert list(shiftjis.iter_runs('\nABｱ日本あ\\가d')) == [
+        ('single-byte-ascii-control', 0, 1),
+        ('single-byte-ascii-printable', 1, 3),
+        ('single-byte-half-width-katakana', 3, 4),
+        ('double-byte-kanji', 4, 6),
+        ('double-byte-other', 6, 7),
+        ('unencodable', 7, 9),
+        ('single-byte-ascii-printable', 9, 10),
+    ]
+    assert list(shiftjis.iter_runs('')) == []
+
+
+def test_is_encodable():
+    assert shiftjis.is_encodable('abc日本ｱ')
+    assert shiftjis.is_encodable('')
+    assert not shiftjis.is_encodable('a\\b日本😈')
+    assert shiftjis.find_unencodable('abc日本ｱ') == []
+    assert shiftjis.find_unencodable('a\\b日本😈') == [(1, '\\'), (5, '😈')]
+
+
+def test_find():
+    bs = shiftjis.encode('ソ表¥')
+    assert list(shiftjis.finditer(bs, '¥')) == [4]
+    assert shiftjis.find(bs, '¥') == 4
+    assert shiftjis.find(bs, '¥', 0, 4) == -1
+    assert shiftjis.find(shiftjis.encode('ソ表'), '¥') == -1
+
+    # 与解码后查找的结果比较，覆盖跨过较长的双字节字符序列的情况
+    alphabet = shiftjis.get_alphabet()
+    cs = ''.join(alphabet[(index * 7919) % len(alphabet)] for index in range(2000)) + '\n' + ''.join(alphabet[:1000])
+    bs = shiftjis.encode(cs)
+    for sub in {cs[1500:1501], cs[1900:1902], alphabet[500], alphabet[-1]}:
+        expected = []
+        index = cs.find(sub)
+        while index != -1:
+            expected.append(len(shiftjis.encode(cs[:index])))
+            index = cs.find(sub, index + len(sub))
+        assert list(shiftjis.finditer(bs, sub)) == expected
+
+    with pytest.raises(ShiftJISEncodeError):
+        shiftjis.find(bs, '\\')
+    with pytest.raises(ValueError):
+        shiftjis.find(bs, '')
+
+
+def test_sort_key():
+    css = ['亜', 'ア', 'abc', 'ｱ', 'あ', 'ア\\', '😈', '']
+    assert sorted(css, key=shiftjis.sort_key) == ['', 'abc', 'ｱ', 'あ', 'ア', 'ア\\', '亜', '😈']
+    assert shiftjis.sort_key('aｱ') == b'\x00a\x00\xb1'
+    assert shiftjis.sort_key('\\') == b'\xff\xff\x00\x00\x5c'
+    assert shiftjis.sort_keys(css) == [shiftjis.sort_key(cs) for cs in css]
+    assert shiftjis.sort_keys(['a日', '本']) == [b'\x00a\x93\xfa', b'\x96\x7b']
+    assert shiftjis.sort_keys([]) == []
+
+
 def test_alphabet():
     alphabet = shiftjis.get_alphabet_single_byte_ascii_control()
     assert len(alphabet) == 33
@@ -96,6 +309,121 @@ def test_count():
     assert shiftjis.get_count() == 7070
 
 
+def test_index():
+    alphabet = shiftjis.get_alphabet()
+    for index, c in enumerate(alphabet):
+        assert shiftjis.index_of(c) == index
+        assert shiftjis.char_at(index) == c
+
+    assert shiftjis.index_of('亜', 'double-byte-kanji') == 0
+    assert shiftjis.char_at(0, 'double-byte-kanji') == '亜'
+    assert shiftjis.index_of('亜') == shiftjis.get_count() - shiftjis.get_double_byte_kanji_count()
+
+    with pytest.raises(ShiftJISException):
+        shiftjis.index_of('가')
+    with pytest.raises(ShiftJISException):
+        shiftjis.index_of('亜', 'double-byte-other')
+    with pytest.raises(ShiftJISException):
+        shiftjis.index_of('亜', 'unknown')
+    with pytest.raises(ShiftJISException):
+        shiftjis.index_of('😈')
+    with pytest.raises(ShiftJISException):
+        shiftjis.index_of('abc')
+    with pytest.raises(ShiftJISException):
+        shiftjis.char_at(-1)
+    with pytest.raises(ShiftJISException):
+        shiftjis.char_at(len(alphabet))
+
+
+def test_chars_in_unicode_range():
+    alphabet = shiftjis.get_alphabet()
+    chars = shiftjis.chars_in_unicode_range(0x4E00, 0x9FFF)
+    assert chars[:2] == ['一', '丁']
+    assert chars == sorted(c for c in alphabet if 0x4E00 <= ord(c) <= 0x9FFF)
+    assert shiftjis.chars_in_unicode_range(0x4E00, 0x9FFF, 'double-byte-kanji') == sorted(c for c in chars if shiftjis.query_category(c) == 'double-byte-kanji')
+    assert shiftjis.chars_in_unicode_range(0, 0x10FFFF) == sorted(alphabet)
+    assert shiftjis.chars_in_unicode_range(0x1F600, 0x1F64F) == []
+
+    with pytest.raises(ShiftJISException):
+        shiftjis.chars_in_unicode_range(0x9FFF, 0x4E00)
+    with pytest.raises(ShiftJISException):
+        shiftjis.chars_in_unicode_range(0, 0x110000)
+    with pytest.raises(ShiftJISException):
+        shiftjis.chars_in_unicode_range(0, 0xFFFF, 'unknown')
+
+
+def test_iter_defined():
+    assert list(shiftjis.iter_defined(0x5B, 0x5D)) == [(0x5B, '['), (0x5C, '¥'), (0x5D, ']')]
+    defined = list(shiftjis.iter_defined(0x889F, 0x88FC))
+    assert defined[0] == (0x889F, '亜')
+    for code, c in defined:
+        assert shiftjis.decode(code.to_bytes(2, 'big')) == c
+    assert sorted(c for _, c in shiftjis.iter_defined()) == sorted(shiftjis.get_alphabet())
+
+
+def test_truncate_to_bytes():
+    assert shiftjis.truncate_to_bytes('abcｱｲ日本', 6) == 'abcｱｲ'
+    assert shiftjis.truncate_to_bytes('abcｱｲ日本', 7) == 'abcｱｲ日'
+    assert shiftjis.truncate_to_bytes('日本', 3) == '日'
+
+    with pytest.raises(ShiftJISEncodeError):
+        shiftjis.truncate_to_bytes('a\\日本', 5)
+
+
+def test_record():
+    bs = shiftjis.encode_record(['ｱｲｳ', '日本'], [4, 5])
+    assert bs == shiftjis.encode('ｱｲｳ') + b' ' + shiftjis.encode('日本') + b' '
+    assert shiftjis.decode_record(bs, [4, 5]) == ['ｱｲｳ', '日本']
+    assert shiftjis.encode_record(['日本語'], [5], truncate=True) == shiftjis.encode('日本') + b' '
+
+
+def test_pack():
+    bs = shiftjis.pack('abc日本語ｱ¥')
+    assert len(bs) == 14
+    assert shiftjis.unpack(bs) == 'abc日本語ｱ¥'
+    assert shiftjis.unpack(bs + shiftjis.pack('a')) == 'abc日本語ｱ¥' + 'a'
+    assert shiftjis.pack('') == b''
+    assert shiftjis.unpack(b'') == ''
+    alphabet = ''.join(shiftjis.get_alphabet())
+    assert shiftjis.unpack(shiftjis.pack(alphabet)) == alphabet
+
+    packer = shiftjis.IncrementalPacker()
+    unpacker = shiftjis.IncrementalUnpacker()
+    cs = ''
+    for c in 'abc日本語ｱ¥' * 3:
+        cs += unpacker.unpack(packer.pack(c))
+    cs += unpacker.unpack(packer.pack('', final=True), final=True)
+    assert cs == 'abc日本語ｱ¥' * 3
+
+    with pytest.raises(ShiftJISEncodeError) as info:
+        shiftjis.pack('日\\')
+    assert info.value.position == 1
+    with pytest.raises(ShiftJISEncodeError) as info:
+        shiftjis.IncrementalPacker().pack('abcd' + '日\\', final=True)
+    assert info.value.position == 5
+    with pytest.raises(ShiftJISDecodeError) as info:
+        shiftjis.unpack(bs[:10])
+    assert info.value.position == 7
+    with pytest.raises(ShiftJISDecodeError) as info:
+        shiftjis.unpack(bs + b'\xfe\xff\xff\xff\xff\xff\xff')
+    assert info.value.position == 14
+
+
+def test_category_counter():
+    counter = shiftjis.CategoryCounter()
+    counter.update_bytes(shiftjis.encode('abｱ日本日。'), final=True)
+    assert counter.get_category_counts() == {
+        'single-byte-ascii-control': 0,
+        'single-byte-ascii-printable': 2,
+        'single-byte-half-width-katakana': 1,
+        'double-byte-other': 1,
+        'double-byte-kanji': 3,
+        None: 0,
+        'unencodable': 0,
+    }
+    assert counter.most_common(1, 'double-byte-kanji') == [('日', 2)]
+
+
 def test_unicode():
     alphabet_single_byte_ascii_control = []
     alphabet_single_byte_ascii_printable = []